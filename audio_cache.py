@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Settings every cached transcode is keyed by; bump when the export changes
+TRANSCODE_SETTINGS = {"format": "mp3", "version": 1}
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content, used as the cache key of local sources."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return "sha256:" + digest.hexdigest()
+
+
+class AudioCache:
+    """Content-addressed store of processed audio files with LRU eviction.
+
+    Entries are keyed by a source key (a video ID such as ``"yt:<id>"`` or
+    a ``file_digest``) plus the settings used to produce them. Files are
+    written under a temporary name and moved into place, and the index is
+    replaced atomically, so a crash never leaves a half-written entry.
+    Entries used during this session are never evicted, so files the app
+    is currently pointing at stay on disk.
+    """
+
+    def __init__(self, root=os.path.join("downloads", "cache"), max_bytes=2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._live = set()  # Keys handed out since the cache was opened
+        self._dirty = False
+        os.makedirs(root, exist_ok=True)
+        self._entries = self._load_index()  # key -> {"file", "size", "used"}
+
+    @staticmethod
+    def key(source_key, settings):
+        payload = json.dumps([source_key, settings], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, source_key, settings=TRANSCODE_SETTINGS):
+        """Return the cached file for a source, or None on a miss."""
+        found = self.lookup(source_key, settings)
+        return found[0] if found else None
+
+    def lookup(self, source_key, settings=TRANSCODE_SETTINGS):
+        """Return ``(path, meta)`` for a cached source, or None on a miss."""
+        key = self.key(source_key, settings)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.exists(self._path(entry)):
+                del self._entries[key]  # Deleted behind our back
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["used"] = time.time()
+            self._live.add(key)
+            self._dirty = True
+            return self._path(entry), entry.get("meta", {})
+
+    def store(self, source_key, produce, settings=TRANSCODE_SETTINGS, suffix=".mp3", meta=None):
+        """Run ``produce(tmp_path)`` and atomically publish its output.
+
+        ``meta`` is a small JSON-able dict kept in the index next to the
+        entry (read after ``produce`` ran, so it may fill it in). Returns the
+        final path of the entry.
+        """
+        key = self.key(source_key, settings)
+        name = os.path.join(key[:2], key + suffix)
+        final_path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path), suffix=suffix + ".tmp")
+        os.close(fd)
+        try:
+            produce(tmp_path)
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._entries[key] = {
+                "file": name,
+                "size": os.path.getsize(final_path),
+                "used": time.time(),
+            }
+            if meta:
+                self._entries[key]["meta"] = meta
+            self._live.add(key)
+            self._evict()
+            self._save_index()
+        return final_path
+
+    def stats(self):
+        with self._lock:
+            total = sum(entry["size"] for entry in self._entries.values())
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": total,
+            }
+
+    def flush(self):
+        """Persist last-used times gathered by ``get``."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    # Internals (call with the lock held)
+
+    def _path(self, entry):
+        return os.path.join(self.root, entry["file"])
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            if key in self._live:
+                continue
+            try:
+                os.remove(self._path(entry))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del self._entries[key]
+            self.evictions += 1
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
@@ -0,0 +1,119 @@
+"""Redraw time of the bracket renderer against bracket size.
+
+Run from the repository root:
+
+    python benchmarks/bench_render.py [--headless]
+
+With a display, a real (withdrawn) Tk canvas is used. ``--headless`` (or no
+display) swaps in a canvas that only counts item operations, which still
+measures the renderer's own bookkeeping.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bracket import Bracket
+from renderer import BracketRenderer
+
+SIZES = (8, 64, 256, 1024, 4096, 16384, 65536)
+
+
+class CountingCanvas:
+    """The subset of tk.Canvas used by the renderer, without drawing anything."""
+
+    def __init__(self, width=800, height=600):
+        self.width = width
+        self.height = height
+        self.items = 0
+        self.operations = 0
+
+    def bind(self, sequence, func):
+        pass
+
+    def after_idle(self, func):
+        return "idle"
+
+    def config(self, **options):
+        self.operations += 1
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def _create(self, *args, **options):
+        self.items += 1
+        self.operations += 1
+        return self.items
+
+    create_rectangle = create_text = create_line = create_polygon = _create
+
+    def itemconfigure(self, tag, **options):
+        self.operations += 1
+
+    def delete(self, tag):
+        self.operations += 1
+
+
+def make_canvas(headless):
+    if not headless:
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+        except Exception:
+            headless = True
+        else:
+            root.withdraw()
+            canvas = tk.Canvas(root, width=800, height=600)
+            canvas.pack()
+            root.update_idletasks()
+            return canvas, "tk"
+    return CountingCanvas(), "headless"
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench(size, canvas):
+    bracket = Bracket([f"Song {i}" for i in range(size)])
+    renderer = BracketRenderer(canvas)
+    renderer.bracket = bracket
+
+    first = timed(renderer.refresh)
+    match = bracket.rounds[0][0]
+    match.set_winner(match.competitor_a)
+    vote = timed(renderer.refresh)
+    idle = timed(renderer.refresh)
+    renderer.set_bracket(None)
+    renderer.refresh()
+    return first, vote, idle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--headless", action="store_true", help="do not open a Tk canvas")
+    args = parser.parse_args()
+
+    canvas, kind = make_canvas(args.headless)
+    print(f"canvas: {kind}")
+    print(f"{'songs':>8} {'first draw ms':>14} {'after vote ms':>14} {'no-op ms':>10}")
+    for size in SIZES:
+        first, vote, idle = bench(size, canvas)
+        print(f"{size:>8} {first:>14.2f} {vote:>14.2f} {idle:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
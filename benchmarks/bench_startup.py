@@ -0,0 +1,76 @@
+"""Cold-start time of the headless engine and CLI, against a budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--budget 0.5] [--runs 5]
+
+Each case runs in a fresh interpreter; the best of ``--runs`` wall times is
+reported. The run fails (exit code 1) if a case goes over the budget or if
+importing the engine pulls in any of the heavy modules below.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "pygame", "pydub", "pytubefix", "tkinter", "mutagen")
+
+
+def best_time(command, runs):
+    """Best wall time of ``command``, or of ``command(run)`` if it is callable."""
+    best = float("inf")
+    for run in range(runs):
+        args = command(run) if callable(command) else command
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def heavy_imports(module):
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds per cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    state = tempfile.mkdtemp()
+    ratings = os.path.join(state, "ratings.db")  # Keep the votes out of the real ratings
+    songs = [f"Song {idx}" for idx in range(64)]
+    cases = [
+        ("python (baseline)", [sys.executable, "-c", "pass"]),
+        ("import engine", [sys.executable, "-c", "import engine"]),
+        ("cli.py --help", [sys.executable, "cli.py", "--help"]),
+        ("cli.py new (64 songs)", [sys.executable, "cli.py", "--state", state, "new"] + songs),
+        # A match can only be decided once, so every run votes on the next one
+        ("cli.py vote", lambda run: [sys.executable, "cli.py", "--state", state, "vote", str(run), "a", "--ratings", ratings]),
+        ("cli.py export", [sys.executable, "cli.py", "--state", state, "export"]),
+    ]
+
+    failed = False
+    print(f"{'case':<24}{'seconds':>10}")
+    for name, command in cases:
+        seconds = best_time(command, args.runs)
+        over = seconds > args.budget
+        failed |= over
+        print(f"{name:<24}{seconds:>10.3f}{'  OVER BUDGET' if over else ''}")
+
+    for module in ("engine", "cli"):
+        loaded = heavy_imports(module)
+        if loaded:
+            failed = True
+            print(f"import {module} loads heavy modules: {', '.join(loaded)}")
+    print(f"budget {args.budget:.3f}s: {'FAILED' if failed else 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Timings of the bracket and the renderer from 8 to 100,000 songs.
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py [--json results.json] [--compare baseline.json]
+
+Every case reports the best of ``--repeat`` runs in milliseconds. ``--json``
+saves the results; ``--compare`` checks them against a saved run and exits
+with code 1 if any case got slower by more than ``--tolerance`` (default 25%,
+ignoring cases under a millisecond). ``--profile trace.json`` also records
+the instrumented spans and writes them as a Chrome trace.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+from bench_render import CountingCanvas
+from bracket import Bracket
+from renderer import BracketRenderer
+
+SIZES = (8, 64, 512, 4096, 32768, 100_000)
+
+
+def best_ms(func, repeat, setup=None):
+    """Best wall time of ``func(setup())`` over ``repeat`` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def play_out(bracket):
+    """Decide every match for competitor a, round by round."""
+    while True:
+        for match in bracket.get_current_round_matches():
+            match.set_winner(match.competitor_a)
+        if bracket.advance_to_next_round() is None:
+            return
+
+
+def bench_size(size, repeat, directory):
+    names = [f"Song {i}" for i in range(size)]
+    results = {}
+    results["bracket.build"] = best_ms(lambda: Bracket(names), repeat)
+    results["bracket.play_out"] = best_ms(play_out, repeat, setup=lambda: Bracket(names))
+
+    half_done = Bracket(names)
+    for match in half_done.get_current_round_matches():
+        match.set_winner(match.competitor_b)
+    path = os.path.join(directory, f"bracket-{size}.bin")
+    results["bracket.save"] = best_ms(lambda: half_done.save(path), repeat)
+    results["bracket.load"] = best_ms(lambda: Bracket.load(path), repeat)
+
+    def renderer_for(bracket):
+        renderer = BracketRenderer(CountingCanvas())
+        renderer.bracket = bracket
+        return renderer
+
+    results["renderer.first_draw"] = best_ms(
+        lambda renderer: renderer.refresh(), repeat, setup=lambda: renderer_for(Bracket(names))
+    )
+
+    def drawn_after_vote():
+        renderer = renderer_for(Bracket(names))
+        renderer.refresh()
+        match = renderer.bracket.rounds[0][0]
+        match.set_winner(match.competitor_a)
+        return renderer
+
+    results["renderer.after_vote"] = best_ms(lambda renderer: renderer.refresh(), repeat, setup=drawn_after_vote)
+
+    def drawn_finished():
+        bracket = Bracket(names)
+        play_out(bracket)
+        renderer = renderer_for(bracket)
+        renderer.refresh()
+        return renderer
+
+    results["renderer.no_op"] = best_ms(lambda renderer: renderer.refresh(), repeat, setup=drawn_finished)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, cases in results.items():
+        for case, ms in cases.items():
+            before = baseline.get(size, {}).get(case)
+            if before is not None and ms >= 1.0 and ms > before * (1 + tolerance):
+                regressions.append(f"{case} at {size} songs: {before:.2f} -> {ms:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="save results to this file")
+    parser.add_argument("--compare", help="baseline results to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--profile", metavar="TRACE", help="record spans and write a Chrome trace")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.enable()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            results[str(size)] = bench_size(size, args.repeat, directory)
+
+    cases = list(next(iter(results.values())))
+    print(f"{'songs':>8}" + "".join(f"{case.split('.', 1)[1]:>13}" for case in cases))
+    print(f"{'':>8}" + "".join(f"{case.split('.', 1)[0]:>13}" for case in cases))
+    for size, timings in results.items():
+        print(f"{size:>8}" + "".join(f"{timings[case]:>13.2f}" for case in cases))
+    print("(milliseconds)")
+
+    if args.profile:
+        print(f"Wrote {profiling.export_trace(args.profile)} trace events to {args.profile}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Load generator for the audience vote server.
+
+Run from the repository root:
+
+    python benchmarks/bench_votes.py [--clients 2000] [--matches 5]
+
+Starts a VoteServer on a free local port, then for every match opens it
+and has each simulated client (one keep-alive connection per voter) fetch
+its signed voter cookie from the voting page, then cast one vote plus one
+duplicate to exercise deduplication. Reports votes per second and latency
+percentiles per request.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vote_server import VoteServer, VoteService
+
+
+async def read_response(reader):
+    """Return the headers (lower-cased names) and body of one response."""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers, await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+async def fetch_cookie(reader, writer):
+    """Load the voting page like a phone does and return its voter cookie."""
+    writer.write(b"GET / HTTP/1.1\r\nHost: bench\r\n\r\n")
+    await writer.drain()
+    headers, _ = await read_response(reader)
+    return headers["set-cookie"].split(";", 1)[0]
+
+
+async def post_vote(reader, writer, cookie, match_key, choice):
+    body = f"match={match_key}&choice={choice}".encode("ascii")
+    writer.write(
+        b"POST /vote HTTP/1.1\r\nHost: bench\r\n"
+        b"Content-Type: application/x-www-form-urlencoded\r\n"
+        + f"Cookie: {cookie}\r\nContent-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+    await writer.drain()
+    return (await read_response(reader))[1]
+
+
+async def client(port, voter, match_key, latencies, start_gate):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    cookie = await fetch_cookie(reader, writer)
+    await start_gate.wait()
+    for _ in range(2):  # The second vote must be rejected as a duplicate
+        started = time.perf_counter()
+        await post_vote(reader, writer, cookie, match_key, voter % 2)
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+
+
+async def run_match(port, service, clients, match_idx):
+    match_key = f"match-{match_idx}"
+    service.open_match(match_key, ("Song A", "Song B"))
+    latencies = []
+    start_gate = asyncio.Event()
+    tasks = [asyncio.create_task(client(port, voter, match_key, latencies, start_gate)) for voter in range(clients)]
+    await asyncio.sleep(0.2)  # Let every client connect first
+    started = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    counts = service.close_match()
+    return len(latencies), elapsed, sorted(latencies), counts
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def main(args):
+    service = VoteService()
+    server = VoteServer(service, host="127.0.0.1", port=0)
+    server.start()
+    print(f"{args.clients} clients, {args.matches} matches, server on port {server.port}")
+    print(f"{'match':>5} {'requests/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'counts':>14}")
+    try:
+        for match_idx in range(args.matches):
+            requests, elapsed, latencies, counts = await run_match(server.port, service, args.clients, match_idx)
+            assert sum(counts) == args.clients, "every voter counted exactly once"
+            print(
+                f"{match_idx:>5} {requests / elapsed:>11.0f} {percentile(latencies, 0.5):>8.2f} "
+                f"{percentile(latencies, 0.99):>8.2f} {latencies[-1] * 1000:>8.2f} {str(counts):>14}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000, help="concurrent simulated voters")
+    parser.add_argument("--matches", type=int, default=5, help="matches to vote on")
+    asyncio.run(main(parser.parse_args()))
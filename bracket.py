@@ -1,39 +1,189 @@
+from collections import OrderedDict
+
+import profiling
 from competitor import Competitor
-from match import Match
-import math
+from match import BracketMatch
+from bracket_tree import EMPTY, BracketTree
+
+COMPETITOR_CACHE_SIZE = 4096  # Wrapped plain names kept alive by Bracket.competitor
+
+
+class RoundView:
+    """Read-only sequence of the matches of one round, created on access."""
+
+    def __init__(self, bracket, round_idx):
+        self.bracket = bracket
+        self.round_idx = round_idx
+        tree = bracket.tree
+        if round_idx == 0:
+            self.nodes = tree.first_round  # Bye matches never become a Match
+        else:
+            self.nodes = range(*tree.round_range(round_idx))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return BracketMatch(self.bracket, self.nodes[idx])
+
+    def __iter__(self):
+        for node in self.nodes:
+            yield BracketMatch(self.bracket, node)
+
+
+class RoundsView:
+    """Sequence of the rounds started so far, like the old list of lists."""
+
+    def __init__(self, bracket):
+        self.bracket = bracket
+
+    def __len__(self):
+        return self.bracket.current_round + 1 if self.bracket.tree.depth else 0
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("round index out of range")
+        return RoundView(self.bracket, idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield RoundView(self.bracket, idx)
+
 
 class Bracket:
-    def __init__(self, competitors):
+    def __init__(self, competitors, ratings=None):
         self.competitors = competitors
-        self.rounds = []  # List of all rounds
+        self.ratings = ratings  # {song ID or name: strength}, see ratings.RatingStore
+        self.tree = None
+        self.rounds = RoundsView(self)  # Views of all rounds started so far
         self.current_round = 0  # Current round index
+        self.journal = None  # Receives record(node, value) for every change, see persistence
+        self._competitor_cache = OrderedDict()  # Entrant index -> Competitor for plain names, LRU
         self.generate_bracket()
 
+    @classmethod
+    def restore(cls, competitors, slots, current_round):
+        """Rebuild a bracket from its competitors and saved tree slots."""
+        bracket = cls.__new__(cls)
+        bracket.competitors = competitors
+        bracket.ratings = None
+        bracket.tree = BracketTree.from_slots(len(competitors), slots)
+        bracket.rounds = RoundsView(bracket)
+        bracket.current_round = current_round
+        bracket.journal = None
+        bracket._competitor_cache = OrderedDict()
+        return bracket
+
+    def save(self, path):
+        """Write a compact snapshot of the bracket to ``path``."""
+        from persistence import write_snapshot
+        write_snapshot(self, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a bracket written by ``save``."""
+        from persistence import read_snapshot
+        return read_snapshot(path)[0]
+
+    def resolve_from_votes(self, source, tiebreak="seed", chunk_size=500_000, seed=None):
+        """Decide all remaining rounds from an offline vote log.
+
+        ``source`` is a CSV/JSON Lines path (see ``vote_replay.read_vote_rows``)
+        or an iterable of ``(voter, matchup, choice)`` rows. Returns ``rounds``.
+        """
+        from vote_replay import count_votes, read_vote_rows, resolve_bracket
+        rows = read_vote_rows(source) if isinstance(source, str) else source
+        return resolve_bracket(self, count_votes(rows, chunk_size), tiebreak, seed)
+
     def generate_bracket(self):
-        """Generate the tournament bracket."""
-        competitors = [Competitor(name, "") for name in self.competitors]
+        """Generate the tournament bracket, seeded by strength when ratings are known."""
+        # Byes are stored in the tree and advance automatically, so the field
+        # is never padded with placeholder competitors.
+        leaves = None
+        if self.ratings:
+            size = 1 << (len(self.competitors) - 1).bit_length()
+            leaves = BracketTree.seeded_leaves(self.seed_order(), size)
+        self.tree = BracketTree(len(self.competitors), leaves)
+        self.current_round = 0
+
+    def seed_order(self):
+        """Entrant indexes strongest first; unrated songs count as average (0)."""
+        strength = []
+        for entrant in range(len(self.competitors)):
+            competitor = self.competitor(entrant)
+            strength.append(self.ratings.get(competitor.song_id or competitor.name, 0.0))
+        # Stable, so equal ratings keep upload order
+        return sorted(range(len(self.competitors)), key=lambda entrant: -strength[entrant])
 
-        # Ensure competitors count is a power of 2
-        next_power_of_2 = 2 ** math.ceil(math.log2(len(competitors)))
-        while len(competitors) < next_power_of_2:
-            competitors.append(Competitor("TBD", ""))
+    def competitor(self, entrant):
+        """Return the Competitor for an entrant index.
 
-        # First round
-        self.rounds.append([Match(competitors[i], competitors[i + 1]) for i in range(0, len(competitors), 2)])
+        Plain song names are wrapped on first use and kept in a small LRU
+        cache, so the matches on screen keep handing out the same objects
+        without holding one per entrant of a huge bracket.
+        """
+        competitor = self.competitors[entrant]
+        if isinstance(competitor, Competitor):
+            return competitor
+        cache = self._competitor_cache
+        wrapped = cache.get(entrant)
+        if wrapped is None:
+            wrapped = cache[entrant] = Competitor(competitor, "")
+            if len(cache) > COMPETITOR_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(entrant)
+        return wrapped
+
+    def competitor_at(self, node):
+        """Return the Competitor stored at a tree slot, or None if undecided."""
+        entrant = self.tree.slots[node]
+        return self.competitor(entrant) if entrant >= 0 else None
+
+    def undecided(self):
+        """Match nodes of every round that have no winner yet."""
+        return [node for node in range(1, self.tree.size) if self.tree.slots[node] == EMPTY]
+
+    def results(self, nodes):
+        """``(winner, loser)`` Competitors of the decided matches among ``nodes``, byes left out."""
+        results = []
+        for node in nodes:
+            winner = self.tree.slots[node]
+            a, b = self.tree.competitors(node)
+            if winner >= 0 and a >= 0 and b >= 0:
+                results.append((self.competitor(winner), self.competitor(b if winner == a else a)))
+        return results
+
+    def set_winner(self, node, side):
+        """Record side 0 (competitor a) or 1 (competitor b) as winner of a match."""
+        if node < 1 or node >= self.tree.size:
+            raise ValueError("Not a match node")
+        if not self.tree.is_playable(node):
+            raise ValueError("Match is a bye, not ready yet or already decided")
+        entrant = self.tree.slots[2 * node + side]
+        self.tree.set_winner(node, entrant)
+        if self.journal is not None:
+            self.journal.record(node, entrant)
 
     def get_current_round_matches(self):
         """Return the matches for the current round."""
         return self.rounds[self.current_round]
 
+    @profiling.instrument("bracket.advance_to_next_round")
     def advance_to_next_round(self):
         """Move to the next round with the current round's winners."""
-        current_matches = self.get_current_round_matches()
-        winners = [match.get_winner() for match in current_matches if match.get_winner()]
-
-        if len(winners) < 2:
+        if self.current_round + 1 >= self.tree.depth:
             return None  # Tournament is over
+        if not self.tree.is_round_complete(self.current_round):
+            raise ValueError("Every match of the current round needs a winner first")
 
-        next_round_matches = [Match(winners[i], winners[i + 1] if i + 1 < len(winners) else None) for i in range(0, len(winners), 2)]
-        self.rounds.append(next_round_matches)
         self.current_round += 1
-        return next_round_matches
+        if self.journal is not None:
+            self.journal.record(0, self.current_round)  # Node 0 marks a round change
+        return self.rounds[self.current_round]
@@ -0,0 +1,145 @@
+from array import array
+
+EMPTY = -1  # Slot not decided yet
+BYE = -2    # Slot with no entrant (the opponent advances automatically)
+
+
+class BracketTree:
+    """Single-elimination bracket stored as one flat array laid out like a heap.
+
+    Node 1 is the final. The children of node ``k`` are ``2k`` and ``2k + 1``
+    and its parent is ``k >> 1``. The leaves (``size`` .. ``2 * size - 1``)
+    hold the entrants, every other node holds the winner of the match played
+    between its two children. Values are entrant indexes, ``EMPTY`` or ``BYE``.
+    """
+
+    def __init__(self, entrant_count, leaves=None):
+        if entrant_count < 1:
+            raise ValueError("A bracket needs at least one entrant")
+        self.entrant_count = entrant_count
+        self.size = 1 << (entrant_count - 1).bit_length()  # Leaves, a power of 2
+        self.depth = self.size.bit_length() - 1  # Number of rounds
+
+        if leaves is None:
+            leaves = self.default_leaves(entrant_count, self.size)
+        if len(leaves) != self.size:
+            raise ValueError("Leaf layout must have one slot per bracket position")
+
+        self.slots = array("i", [EMPTY]) * self.size
+        self.slots.extend(leaves)
+
+        # Byes only ever meet a real entrant in the first round, so they are
+        # resolved right away and the match is never offered to voters.
+        playable = array("i")
+        for node in range(max(self.size >> 1, 1), self.size):
+            a, b = self.slots[2 * node], self.slots[2 * node + 1]
+            if a == BYE or b == BYE:
+                self.slots[node] = b if a == BYE else a
+            else:
+                playable.append(node)
+        self.first_round = playable  # Match nodes of round 0 that need a vote
+
+    @classmethod
+    def from_slots(cls, entrant_count, slots):
+        """Rebuild a tree from a saved ``slots`` array (see ``Bracket.save``)."""
+        tree = cls.__new__(cls)
+        tree.entrant_count = entrant_count
+        tree.size = len(slots) // 2
+        tree.depth = tree.size.bit_length() - 1
+        tree.slots = array("i", slots)
+        tree.first_round = array("i", (
+            node for node in range(max(tree.size >> 1, 1), tree.size)
+            if not tree.is_bye(node)
+        ))
+        return tree
+
+    @staticmethod
+    def default_leaves(entrant_count, size):
+        """Lay entrants out in order, giving the first ``size - n`` of them a bye."""
+        if size == 1:
+            return array("i", [0])  # A lone entrant is already the champion
+        byes = size - entrant_count
+        leaves = array("i")
+        entrant = 0
+        for match_idx in range(size >> 1):
+            leaves.append(entrant)
+            entrant += 1
+            if match_idx < byes:
+                leaves.append(BYE)
+            else:
+                leaves.append(entrant)
+                entrant += 1
+        return leaves
+
+    @staticmethod
+    def seeded_leaves(order, size):
+        """Lay entrants out by seed, ``order`` listing entrant indexes best first.
+
+        Uses the standard seeding pattern (1 v 16, 8 v 9, ...), so the top
+        two seeds can only meet in the final and the byes go to the top seeds.
+        """
+        positions = [0]
+        while len(positions) < size:
+            count = 2 * len(positions)
+            positions = [seed for top in positions for seed in (top, count - 1 - top)]
+        return array("i", (order[seed] if seed < len(order) else BYE for seed in positions))
+
+    # Navigation, all O(1)
+
+    @staticmethod
+    def parent(node):
+        return node >> 1
+
+    @staticmethod
+    def children(node):
+        return 2 * node, 2 * node + 1
+
+    @staticmethod
+    def next_match(node):
+        """The match the winner of ``node`` plays next (0 after the final)."""
+        return node >> 1
+
+    @staticmethod
+    def parent_slot(node):
+        """Which side (0 or 1) of the next match the winner of ``node`` fills."""
+        return node & 1
+
+    def round_of(self, node):
+        """Round index (0 = first round) of the match stored at ``node``."""
+        return self.depth - node.bit_length()
+
+    def round_range(self, round_idx):
+        """Half-open range of match nodes belonging to ``round_idx``."""
+        return self.size >> (round_idx + 1), self.size >> round_idx
+
+    # State
+
+    def competitors(self, node):
+        """Entrant indexes (or EMPTY/BYE) on both sides of the match at ``node``."""
+        return self.slots[2 * node], self.slots[2 * node + 1]
+
+    def winner(self, node):
+        return self.slots[node]
+
+    def is_bye(self, node):
+        a, b = self.competitors(node)
+        return a == BYE or b == BYE
+
+    def is_playable(self, node):
+        a, b = self.competitors(node)
+        return a >= 0 and b >= 0 and self.slots[node] == EMPTY
+
+    def set_winner(self, node, entrant):
+        """Record ``entrant`` as the winner of the match at ``node``."""
+        if node < 1 or node >= self.size:
+            raise ValueError("Not a match node")
+        if entrant < 0 or entrant not in self.competitors(node):
+            raise ValueError("Winner must be one of the competitors")
+        self.slots[node] = entrant
+
+    def is_round_complete(self, round_idx):
+        lo, hi = self.round_range(round_idx)
+        return EMPTY not in self.slots[lo:hi]
+
+    def champion(self):
+        return self.slots[1]
@@ -0,0 +1,175 @@
+"""Run tournaments from the command line, without audio or a display.
+
+    python cli.py new songs/ "Extra Song.mp3" "Just A Name"
+    python cli.py show
+    python cli.py vote 0 a
+    python cli.py advance
+    python cli.py resolve votes.csv
+    python cli.py export -o bracket.json
+
+Every command loads the tournament from the state directory (the same one
+the app uses) and stores it again, so commands can be spread over separate
+runs and the app can pick up where the command line left off.
+"""
+import argparse
+import json
+import sys
+
+from engine import RATINGS_PATH, STATE_DIR, TournamentEngine, competitors_from_paths
+
+
+def cmd_new(args):
+    if args.library:
+        from library import LibraryIndex
+        index = LibraryIndex(args.library)
+        competitors = index.query(artist=args.artist, genre=args.genre,
+                                  min_duration=args.min_length, max_duration=args.max_length)
+        index.close()
+    else:
+        competitors = []
+    competitors += competitors_from_paths(args.songs)
+
+    ratings = None
+    if args.ratings:
+        from ratings import RatingStore
+        store = RatingStore(args.ratings)
+        ratings = store.ratings()
+        store.close()
+
+    engine = TournamentEngine.create(competitors, args.state, ratings=ratings)
+    print(f"Started a tournament of {len(competitors)} songs over {engine.rounds_total} rounds")
+    show(engine)
+    return engine
+
+
+def cmd_show(args):
+    engine = TournamentEngine.resume(args.state)
+    show(engine)
+    return engine
+
+
+def cmd_vote(args):
+    engine = TournamentEngine.resume(args.state)
+    side = {"a": 0, "1": 0, "b": 1, "2": 1}.get(args.side.lower())
+    if side is None:
+        raise ValueError("Side must be a or b")
+    match = engine.vote(args.match, side)
+    record_results(args.ratings, engine.bracket.results([match.node]))
+    print(f"{match.get_winner().name} wins match {args.match}")
+    champion = engine.champion()
+    if champion is not None:
+        print(f"The winner is: {champion.name}")
+    elif not engine.open_matches():
+        print("Round complete, run 'advance' for the next one")
+    return engine
+
+
+def cmd_advance(args):
+    engine = TournamentEngine.resume(args.state)
+    if not engine.advance():
+        champion = engine.champion()
+        print(f"The winner is: {champion.name}" if champion else "The final has not been decided yet")
+    else:
+        show(engine)
+    return engine
+
+
+def cmd_resolve(args):
+    engine = TournamentEngine.resume(args.state)
+    record_results(args.ratings, engine.resolve(args.votes, tiebreak=args.tiebreak, seed=args.seed))
+    print(f"The winner is: {engine.champion().name}")
+    return engine
+
+
+def cmd_export(args):
+    engine = TournamentEngine.resume(args.state)
+    text = json.dumps(engine.export(), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return engine
+
+
+def record_results(path, results):
+    """Add decided matches to the ratings database the app seeds from."""
+    from ratings import RatingStore
+    store = RatingStore(path)
+    store.record_many(results)
+    store.update()
+    store.close()
+
+
+def show(engine):
+    champion = engine.champion()
+    if champion is not None:
+        print(f"The winner is: {champion.name}")
+        return
+    print(f"Round {engine.current_round + 1} of {engine.rounds_total}")
+    for idx, match in enumerate(engine.matches()):
+        winner = match.get_winner()
+        result = f"  -> {winner.name}" if winner else ""
+        print(f"  [{idx}] a: {match.competitor_a.name}  vs  b: {match.competitor_b.name}{result}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless music tournament")
+    parser.add_argument("--state", default=STATE_DIR, help="tournament state directory (default: %(default)s)")
+    parser.add_argument("--profile", metavar="TRACE", help="record timings and write them as a Chrome trace")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    new = commands.add_parser("new", help="start a tournament")
+    new.add_argument("songs", nargs="*", help="audio files, folders of audio files or song names")
+    new.add_argument("--library", help="add songs from a library index (see library.py)")
+    new.add_argument("--artist")
+    new.add_argument("--genre")
+    new.add_argument("--min-length", type=float, help="seconds")
+    new.add_argument("--max-length", type=float, help="seconds")
+    new.add_argument("--ratings", help="seed by strength from a ratings database (see ratings.py)")
+    new.set_defaults(func=cmd_new)
+
+    show_cmd = commands.add_parser("show", help="show the current round")
+    show_cmd.set_defaults(func=cmd_show)
+
+    vote = commands.add_parser("vote", help="decide a match of the current round")
+    vote.add_argument("match", type=int, help="match number shown by 'show'")
+    vote.add_argument("side", help="a or b")
+    vote.add_argument("--ratings", default=RATINGS_PATH, help="ratings database to record the result in (default: %(default)s)")
+    vote.set_defaults(func=cmd_vote)
+
+    advance = commands.add_parser("advance", help="move on to the next round")
+    advance.set_defaults(func=cmd_advance)
+
+    resolve = commands.add_parser("resolve", help="decide the rest of the bracket from a vote log")
+    resolve.add_argument("votes", help="CSV or JSON Lines vote log")
+    resolve.add_argument("--tiebreak", choices=("seed", "random"), default="seed")
+    resolve.add_argument("--seed", type=int)
+    resolve.add_argument("--ratings", default=RATINGS_PATH, help="ratings database to record the results in (default: %(default)s)")
+    resolve.set_defaults(func=cmd_resolve)
+
+    export = commands.add_parser("export", help="write the bracket as JSON")
+    export.add_argument("-o", "--output", help="file to write (default: print it)")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        import profiling
+        profiling.enable()
+    try:
+        engine = args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.profile:
+            profiling.export_trace(args.profile)
+    engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,11 @@
 class Competitor:
-    def __init__(self, name, file_path):
+    __slots__ = ("name", "file_path", "song_id", "metadata")
+
+    def __init__(self, name, file_path, song_id=None, metadata=None):
         self.name = name
         self.file_path = file_path
+        self.song_id = song_id  # Stable key in the SongRegistry
+        self.metadata = metadata if metadata is not None else {}  # Cached tags, gain, ...
 
+    def __repr__(self):
+        return f"Competitor({self.name!r}, {self.file_path!r}, song_id={self.song_id!r})"
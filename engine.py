@@ -0,0 +1,152 @@
+import hashlib
+import os
+
+from bracket import Bracket
+from competitor import Competitor
+from persistence import TournamentStore
+from registry import SongRegistry
+
+STATE_DIR = "tournament_state"  # Snapshot and vote journal of the running tournament
+RATINGS_PATH = "ratings.db"  # Every decided match, across tournaments
+
+
+def competitors_from_paths(paths):
+    """Competitors for audio files, folders of audio files, or plain song names.
+
+    Folders are walked recursively. Anything that is not an existing path
+    is taken as the name of a song without a file, with an ID derived from
+    the name so its ratings and saved results stay attached to it.
+    """
+    competitors = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            from library import walk_audio_files
+            files = sorted(file_path for file_path, _, _ in walk_audio_files(path))
+        elif os.path.isfile(path):
+            files = [path]
+        else:
+            song_id = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+            if song_id not in seen:
+                seen.add(song_id)
+                competitors.append(Competitor(path, "", song_id))
+            continue
+        for file_path in files:
+            song_id = SongRegistry.make_id(file_path)
+            if song_id not in seen:
+                seen.add(song_id)
+                name = os.path.splitext(os.path.basename(file_path))[0]
+                competitors.append(Competitor(name, file_path, song_id, {"source_path": file_path}))
+    return competitors
+
+
+class TournamentEngine:
+    """A tournament without audio or Tk: a Bracket plus its crash-safe store.
+
+    Uses the same state directory layout as the app, so a tournament can be
+    created or advanced here and resumed in the app, and the other way round.
+    Only the bracket, its storage and the standard library are imported;
+    numpy, pygame and the download code load only if a feature needs them.
+    """
+
+    def __init__(self, bracket, store):
+        self.bracket = bracket
+        self.store = store
+
+    @classmethod
+    def create(cls, competitors, state_dir=STATE_DIR, ratings=None):
+        """Start a new tournament, replacing any stored one.
+
+        ``ratings`` (``{song ID or name: strength}``) seeds the bracket by strength.
+        """
+        if len(competitors) < 2:
+            raise ValueError("At least two songs are required to start the tournament")
+        bracket = Bracket(list(competitors), ratings=ratings)
+        store = TournamentStore(state_dir)
+        store.start(bracket)
+        return cls(bracket, store)
+
+    @classmethod
+    def resume(cls, state_dir=STATE_DIR):
+        """Load the tournament stored in ``state_dir``."""
+        if not TournamentStore.exists(state_dir):
+            raise FileNotFoundError(f"No tournament stored in {state_dir}")
+        store = TournamentStore(state_dir)
+        return cls(store.resume(), store)
+
+    @property
+    def current_round(self):
+        return self.bracket.current_round
+
+    @property
+    def rounds_total(self):
+        return self.bracket.tree.depth
+
+    def matches(self):
+        """Matches of the current round."""
+        return self.bracket.get_current_round_matches()
+
+    def open_matches(self):
+        """``(index, match)`` for the current round's matches without a winner."""
+        return [(idx, match) for idx, match in enumerate(self.matches()) if match.get_winner() is None]
+
+    def vote(self, match_idx, side):
+        """Decide match ``match_idx`` of the current round for side 0 (a) or 1 (b)."""
+        matches = self.matches()
+        if not 0 <= match_idx < len(matches):
+            raise ValueError(f"No match {match_idx} in round {self.current_round + 1}")
+        if side not in (0, 1):
+            raise ValueError("Side must be 0 (first song) or 1 (second song)")
+        match = matches[match_idx]
+        match.set_winner(match.competitor_a if side == 0 else match.competitor_b)
+        return match
+
+    def advance(self):
+        """Move to the next round; returns False once the final is decided."""
+        return self.bracket.advance_to_next_round() is not None
+
+    def resolve(self, source, tiebreak="seed", seed=None):
+        """Decide every remaining match from an offline vote log (see ``Bracket.resolve_from_votes``).
+
+        Returns the ``(winner, loser)`` pairs of the matches it decided.
+        """
+        undecided = self.bracket.undecided()
+        self.bracket.resolve_from_votes(source, tiebreak=tiebreak, seed=seed)
+        return self.bracket.results(undecided)
+
+    def champion(self):
+        entrant = self.bracket.tree.champion()
+        return self.bracket.competitor(entrant) if entrant is not None and entrant >= 0 else None
+
+    def export(self):
+        """The whole bracket as plain data, every round including unplayed ones."""
+        tree = self.bracket.tree
+        rounds = []
+        for round_idx in range(tree.depth):
+            nodes = tree.first_round if round_idx == 0 else range(*tree.round_range(round_idx))
+            matches = []
+            for node in nodes:
+                a, b = tree.children(node)
+                matches.append({
+                    "a": self._name_at(a),
+                    "b": self._name_at(b),
+                    "winner": self._name_at(node),
+                })
+            rounds.append(matches)
+        champion = self.champion()
+        return {
+            "current_round": self.current_round,
+            "rounds": rounds,
+            "champion": champion.name if champion else None,
+            "songs": [
+                {"name": competitor.name, "file_path": competitor.file_path, "song_id": competitor.song_id}
+                for competitor in map(self.bracket.competitor, range(len(self.bracket.competitors)))
+            ],
+        }
+
+    def _name_at(self, node):
+        competitor = self.bracket.competitor_at(node)
+        return competitor.name if competitor else None
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,152 @@
+import sqlite3
+
+import numpy as np
+
+FINGERPRINT_RATE = 11025  # Decoding rate for fingerprints, Hz
+FRAME = 2048
+HOP = 1024
+BANDS = 32  # Log-spaced between 300 and 5000 Hz
+SEGMENTS = 64  # Time slices the track is averaged into
+FINGERPRINT_BITS = BANDS * SEGMENTS
+FINGERPRINT_BYTES = FINGERPRINT_BITS // 8
+
+_BAND_EDGES = np.geomspace(300, 5000, BANDS + 1)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def fingerprint_samples(samples, rate):
+    """Compact spectral fingerprint of a mono track, as FINGERPRINT_BYTES bytes.
+
+    The track (minus leading and trailing silence) is cut into frames that
+    are transformed with one batched real FFT, summed into log-spaced bands
+    and averaged into SEGMENTS time slices. Each bit tells whether a band is
+    louder in that slice than its band and slice averages predict, so gain
+    changes and re-encoding flip very few bits.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate != FINGERPRINT_RATE:
+        positions = np.arange(0, len(samples), rate / FINGERPRINT_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    if len(samples) < FRAME:
+        samples = np.pad(samples, (0, FRAME - len(samples)))
+
+    count = 1 + (len(samples) - FRAME) // HOP
+    frames = np.lib.stride_tricks.as_strided(
+        samples, shape=(count, FRAME), strides=(samples.strides[0] * HOP, samples.strides[0])
+    )
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME).astype(np.float32), axis=1)) ** 2
+    bins = np.searchsorted(np.fft.rfftfreq(FRAME, 1 / FINGERPRINT_RATE), _BAND_EDGES)
+    energy = np.add.reduceat(spectrum, bins[:-1], axis=1)[:, :BANDS]
+
+    # Skip quiet intros and outros (below -20 dB of the loud parts)
+    level = energy.sum(axis=1)
+    loud = np.flatnonzero(level > np.percentile(level, 90) * 0.01)
+    if len(loud):
+        energy = energy[loud[0]:loud[-1] + 1]
+        count = len(energy)
+
+    # Average frames into a fixed number of slices, whatever the track length
+    edges = np.linspace(0, count, SEGMENTS + 1).astype(np.int64)
+    edges = np.minimum(edges, count - 1)
+    sums = np.add.reduceat(energy, edges[:-1], axis=0)
+    widths = np.maximum(np.diff(edges), 1)[:, None]
+    energy = np.log(sums / widths + 1e-10)
+
+    # Double-centre so bits ignore gain and the overall spectral tilt
+    contrast = energy - energy.mean(axis=1, keepdims=True) - energy.mean(axis=0) + energy.mean()
+    bits = contrast > 0
+    return np.packbits(bits.ravel()).tobytes()
+
+
+def fingerprint_segment(audio):
+    """Fingerprint an already decoded pydub AudioSegment."""
+    audio = audio.set_channels(1).set_frame_rate(FINGERPRINT_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    return fingerprint_samples(samples, FINGERPRINT_RATE)
+
+
+class FingerprintIndex:
+    """Fingerprints of every imported song with a locality-sensitive hash index.
+
+    Fingerprints are kept in SQLite and, in memory, in one packed array.
+    Each of ``tables`` hash tables keys songs by ``key_bits`` fixed random
+    bits of the fingerprint; near-duplicates agree on most bits, so they
+    share a key in at least one table with high probability, while unrelated
+    songs rarely do. A lookup therefore only compares a handful of
+    candidates instead of the whole library.
+    """
+
+    def __init__(self, path="fingerprints.db", tables=24, key_bits=14, threshold=0.2, seed=0):
+        self.path = path
+        self.threshold = threshold
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS fingerprints (song_id TEXT PRIMARY KEY, fingerprint BLOB NOT NULL)")
+        rng = np.random.default_rng(seed)
+        self._positions = np.stack([rng.choice(FINGERPRINT_BITS, key_bits, replace=False) for _ in range(tables)])
+        self._weights = 1 << np.arange(key_bits, dtype=np.int64)
+        self._tables = [{} for _ in range(tables)]
+        self._song_ids = []
+        self._rows = {}  # song_id -> row in _packed
+        self._packed = np.zeros((0, FINGERPRINT_BYTES), dtype=np.uint8)
+        self._count = 0
+
+        rows = self.db.execute("SELECT song_id, fingerprint FROM fingerprints").fetchall()
+        if rows:
+            packed = np.frombuffer(b"".join(fingerprint for _, fingerprint in rows), dtype=np.uint8)
+            self._insert([song_id for song_id, _ in rows], packed.reshape(len(rows), FINGERPRINT_BYTES))
+
+    def _keys(self, packed):
+        """Hash-table keys of packed fingerprints, shape (rows, tables)."""
+        bits = np.unpackbits(packed, axis=1)
+        return bits[:, self._positions] @ self._weights
+
+    def _insert(self, song_ids, packed):
+        start = self._count
+        needed = start + len(song_ids)
+        if needed > len(self._packed):
+            grown = np.zeros((max(needed, 2 * len(self._packed), 1024), FINGERPRINT_BYTES), dtype=np.uint8)
+            grown[:start] = self._packed[:start]
+            self._packed = grown
+        self._packed[start:needed] = packed
+        self._count = needed
+        for offset, keys in enumerate(self._keys(packed).tolist()):
+            row = start + offset
+            for table, key in zip(self._tables, keys):
+                table.setdefault(key, []).append(row)
+        for offset, song_id in enumerate(song_ids):
+            self._rows[song_id] = start + offset
+            self._song_ids.append(song_id)
+
+    def add(self, song_id, fingerprint):
+        """Store a song's fingerprint; a song that is already indexed keeps its first one."""
+        if song_id in self._rows:
+            return
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?)", (song_id, fingerprint))
+        self._insert([song_id], np.frombuffer(fingerprint, dtype=np.uint8).reshape(1, -1))
+
+    def find_duplicates(self, fingerprint, exclude=None):
+        """``[(song_id, distance)]`` of indexed songs within ``threshold``, closest first."""
+        packed = np.frombuffer(fingerprint, dtype=np.uint8).reshape(1, -1)
+        candidates = set()
+        for table, key in zip(self._tables, self._keys(packed)[0].tolist()):
+            candidates.update(table.get(key, ()))
+        if not candidates:
+            return []
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        distances = _POPCOUNT[self._packed[rows] ^ packed].sum(axis=1) / FINGERPRINT_BITS
+        found = [
+            (self._song_ids[row], float(dist))
+            for row, dist in zip(rows.tolist(), distances.tolist())
+            if dist <= self.threshold and self._song_ids[row] != exclude
+        ]
+        return sorted(found, key=lambda item: item[1])
+
+    def __contains__(self, song_id):
+        return song_id in self._rows
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self.db.close()
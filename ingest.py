@@ -0,0 +1,266 @@
+import contextlib
+import hashlib
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from audio_cache import TRANSCODE_SETTINGS, AudioCache
+
+
+def drain(events, limit=100):
+    """Return up to ``limit`` items of a ``queue.Queue`` without blocking."""
+    items = []
+    while len(items) < limit:
+        try:
+            items.append(events.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+class IngestCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+class PytubefixBackend:
+    """Download audio streams from YouTube videos and playlists."""
+
+    def expand(self, url):
+        """Return the video URLs behind ``url`` (a playlist or a single video)."""
+        if "list=" in url:
+            from pytubefix import Playlist
+            return list(Playlist(url).video_urls)
+        return [url]
+
+    def probe(self, source):
+        """Return ``(song_id, title, handle)`` for a source without downloading it."""
+        from pytubefix import YouTube
+        yt = YouTube(source, 'WEB')  # Use WEB client to auto-generate the POToken
+        return f"yt:{yt.video_id}", yt.title, yt
+
+    def download(self, handle, output_dir, progress):
+        """Download the audio of a probed source, reporting progress in [0, 1]."""
+        audio_stream = handle.streams.filter(only_audio=True).first()
+        if not audio_stream:
+            raise ValueError("No audio streams found for this video.")
+
+        def on_progress(stream, chunk, bytes_remaining):
+            progress(1 - bytes_remaining / stream.filesize)
+
+        handle.register_on_progress_callback(on_progress)
+        return audio_stream.download(output_dir)
+
+
+class LocalFileBackend:
+    """Treat sources as local file paths and "download" them by chunked copy.
+
+    Useful to exercise the ingest pipeline without the network.
+    """
+
+    def __init__(self, chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+
+    def expand(self, url):
+        if url.startswith("file://"):
+            url = url[len("file://"):]
+        if os.path.isdir(url):
+            return sorted(os.path.join(url, name) for name in os.listdir(url))
+        return [url]
+
+    def probe(self, source):
+        digest = hashlib.sha1(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+        title = os.path.splitext(os.path.basename(source))[0]
+        return f"file:{digest}", title, source
+
+    def download(self, handle, output_dir, progress):
+        total = os.path.getsize(handle) or 1
+        target = os.path.join(output_dir, os.path.basename(handle))
+        copied = 0
+        try:
+            with open(handle, "rb") as src, open(target, "wb") as dst:
+                while True:
+                    chunk = src.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    copied += len(chunk)
+                    progress(copied / total)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(target)  # Do not leave a partial copy behind
+            raise
+        return target
+
+
+class IngestJob:
+    """One track moving through the ingest pipeline."""
+
+    def __init__(self, job_id, source):
+        self.job_id = job_id
+        self.source = source
+        self.title = source
+        self.song_id = None
+        self.file_path = None
+        self.meta = {}  # Stored with the file in the audio cache, see ``transcode``
+        self.cached = False  # Served from the audio cache without downloading
+        self.status = "queued"  # queued, downloading, transcoding, done, duplicate, error, cancelled
+        self.progress = 0.0
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+
+class IngestQueue:
+    """Download and transcode tracks on a bounded worker pool.
+
+    Workers never touch Tk. Every state change is posted as a
+    ``(kind, job)`` tuple on ``events``, which the UI drains from the main
+    thread (see ``poll``). ``kind`` is ``"queued"``, ``"progress"``,
+    ``"done"``, ``"duplicate"``, ``"error"`` or ``"cancelled"``.
+    """
+
+    def __init__(
+        self, backend=None, output_dir="downloads", max_workers=4, transcode=None, is_known=None, cache=None,
+        settings=TRANSCODE_SETTINGS,
+    ):
+        self.backend = backend if backend is not None else PytubefixBackend()
+        self.output_dir = output_dir
+        # transcode(src_path, dst_path), defaults to reencode_mp3. A dict it
+        # returns is stored as the file's cache metadata (``job.meta``).
+        self.transcode = transcode
+        self.settings = settings  # Cache key of what ``transcode`` produces
+        self.cache = cache if cache is not None else AudioCache(os.path.join(output_dir, "cache"))
+        self.is_known = is_known if is_known is not None else (lambda song_id: False)
+        self.events = queue.Queue()
+        self.jobs = {}  # job_id -> IngestJob
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._claimed = set()  # song IDs already being ingested
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+
+    def submit(self, urls):
+        """Queue URLs (videos or playlists); returns nothing, jobs show up as events."""
+        for url in urls:
+            self._pool.submit(self._expand, url)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, "cancelled")  # Never started
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            for job in list(self.jobs.values()):
+                job.cancel_event.set()
+        self._pool.shutdown(wait=False, cancel_futures=cancel)
+
+    def poll(self, limit=100):
+        """Return up to ``limit`` pending events without blocking."""
+        return drain(self.events, limit)
+
+    # Worker side
+
+    def _expand(self, url):
+        try:
+            sources = self.backend.expand(url)
+        except Exception as e:
+            job = self._new_job(url)
+            job.error = str(e)
+            self._finish(job, "error")
+            return
+        for source in sources:
+            job = self._new_job(source)
+            job.future = self._pool.submit(self._run, job)
+
+    def _new_job(self, source):
+        with self._lock:
+            job = IngestJob(next(self._ids), source)
+            self.jobs[job.job_id] = job
+        self.events.put(("queued", job))
+        return job
+
+    def _finish(self, job, status):
+        job.status = status
+        self.events.put((status, job))
+
+    def _run(self, job):
+        try:
+            self._check_cancelled(job)
+            with profiling.span("ingest.probe", source=job.source):
+                job.song_id, job.title, handle = self.backend.probe(job.source)
+
+            # Avoid duplicates, including two copies of the same URL in one batch
+            with self._lock:
+                duplicate = job.song_id in self._claimed or self.is_known(job.song_id)
+                if not duplicate:
+                    self._claimed.add(job.song_id)
+            if duplicate:
+                self._finish(job, "duplicate")
+                return
+
+            try:
+                job.file_path = self._ingest(job, handle)
+            except BaseException:
+                with self._lock:
+                    self._claimed.discard(job.song_id)
+                raise
+            self._finish(job, "done")
+        except IngestCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, "error")
+
+    def _ingest(self, job, handle):
+        # Tracks processed before are served straight from the cache
+        found = self.cache.lookup(job.song_id, self.settings)
+        if found is not None:
+            file_path, job.meta = found
+            job.cached = True
+            profiling.count("ingest.cache_hits")
+            return file_path
+
+        incoming_dir = os.path.join(self.output_dir, "incoming")
+        os.makedirs(incoming_dir, exist_ok=True)
+
+        def progress(fraction):
+            self._check_cancelled(job)
+            job.progress = fraction
+            self.events.put(("progress", job))
+
+        job.status = "downloading"
+        with profiling.span("ingest.download", title=job.title):
+            file_path = self.backend.download(handle, incoming_dir, progress)
+        try:
+            self._check_cancelled(job)
+            job.status = "transcoding"
+            self.events.put(("progress", job))
+            transcode = self.transcode
+            if transcode is None:
+                from transcode import reencode_mp3 as transcode
+            meta = {}
+
+            def produce(tmp_path):
+                result = transcode(file_path, tmp_path)
+                if isinstance(result, dict):
+                    meta.update(result)
+
+            with profiling.span("ingest.reencode", title=job.title):
+                # The cache was already checked before downloading
+                cached_path = self.cache.store(job.song_id, produce, self.settings, meta=meta)
+            job.meta = meta
+            return cached_path
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(file_path)  # The cache holds the re-encoded copy
+
+    @staticmethod
+    def _check_cancelled(job):
+        if job.cancel_event.is_set():
+            raise IngestCancelled()
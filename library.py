@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from competitor import Competitor
+from registry import SongRegistry
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac", ".m4a", ".aac", ".opus")
+TAG_FIELDS = ("title", "artist", "album", "genre")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    song_id TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    genre TEXT,
+    duration REAL,
+    scanned REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_genre ON tracks (genre COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_duration ON tracks (duration);
+"""
+
+
+def walk_audio_files(root):
+    """Yield ``(path, mtime_ns, size)`` for every audio file under ``root``.
+
+    Uses ``os.scandir``, whose entries carry the file type (and on Windows
+    the stat result), so the walk costs about one system call per file.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue  # Unreadable directory
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+            except OSError:
+                continue  # Vanished or unreadable file
+
+
+def read_tags(path):
+    """Read title, artist, album, genre and duration with mutagen.
+
+    Missing tags are None. Runs in the scanner's worker processes.
+    """
+    import mutagen
+
+    tags = dict.fromkeys(TAG_FIELDS)
+    tags["duration"] = None
+    try:
+        audio = mutagen.File(path, easy=True)
+    except Exception:
+        audio = None  # Corrupt or unsupported file: indexed without tags
+    if audio is None:
+        return tags
+    for field in TAG_FIELDS:
+        values = audio.tags.get(field) if audio.tags is not None else None
+        if values:
+            tags[field] = str(values[0]).strip() or None
+    if audio.info is not None and getattr(audio.info, "length", None):
+        tags["duration"] = float(audio.info.length)
+    return tags
+
+
+def _read_tags_batch(paths):
+    """Process-pool worker: tags for a batch of files."""
+    return [read_tags(path) for path in paths]
+
+
+class LibraryIndex:
+    """SQLite index of the tracks in one or more music folders.
+
+    ``scan`` walks the folders and only re-reads tags for files whose
+    modification time or size changed, in batches on a process pool, so an
+    unchanged library costs one directory walk and one query. ``query``
+    filters the index by artist, genre and duration to build a field.
+    """
+
+    def __init__(self, path="library.db", max_workers=None, batch_size=64):
+        self.path = path
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def scan(self, roots, progress=None):
+        """Bring the index up to date with the files under ``roots``.
+
+        ``progress(done, total)`` is called as batches of changed files are
+        read. Returns counts of added, updated, removed and unchanged tracks.
+        """
+        if isinstance(roots, str):
+            roots = [roots]
+        known = {}
+        for root in roots:
+            prefix = os.path.join(os.path.abspath(root), "")
+            known.update(
+                (path, (mtime_ns, size))
+                for path, mtime_ns, size in self.db.execute(
+                    "SELECT path, mtime_ns, size FROM tracks WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+            )
+
+        changed = []
+        unchanged = 0
+        for root in roots:
+            for path, mtime_ns, size in walk_audio_files(os.path.abspath(root)):
+                previous = known.pop(path, None)
+                if previous == (mtime_ns, size):
+                    unchanged += 1
+                else:
+                    changed.append((path, mtime_ns, size, previous is None))
+        removed = list(known)  # Indexed but no longer on disk
+
+        stats = {"added": 0, "updated": 0, "removed": len(removed), "unchanged": unchanged}
+        with self.db:
+            self.db.executemany("DELETE FROM tracks WHERE path = ?", ((path,) for path in removed))
+        if not changed:
+            return stats
+
+        batches = [changed[start:start + self.batch_size] for start in range(0, len(changed), self.batch_size)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            for batch, tags in zip(batches, pool.map(_read_tags_batch, [[change[0] for change in batch] for batch in batches])):
+                rows = []
+                for (path, mtime_ns, size, is_new), track in zip(batch, tags):
+                    stats["added" if is_new else "updated"] += 1
+                    rows.append((
+                        path, SongRegistry.make_id(path), mtime_ns, size,
+                        track["title"], track["artist"], track["album"], track["genre"],
+                        track["duration"], time.time(),
+                    ))
+                with self.db:
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO tracks "
+                        "(path, song_id, mtime_ns, size, title, artist, album, genre, duration, scanned) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                done += len(batch)
+                if progress is not None:
+                    progress(done, len(changed))
+        return stats
+
+    def query(self, artist=None, genre=None, min_duration=None, max_duration=None, text=None, limit=None):
+        """Return matching tracks as Competitors, ordered by artist and title.
+
+        ``artist`` and ``genre`` match whole values, ignoring case; ``text``
+        matches any part of the title, artist or album. Durations are seconds.
+        """
+        conditions, params = [], []
+        if artist:
+            conditions.append("artist = ? COLLATE NOCASE")
+            params.append(artist)
+        if genre:
+            conditions.append("genre = ? COLLATE NOCASE")
+            params.append(genre)
+        if min_duration is not None:
+            conditions.append("duration >= ?")
+            params.append(min_duration)
+        if max_duration is not None:
+            conditions.append("duration <= ?")
+            params.append(max_duration)
+        if text:
+            conditions.append("(title LIKE ? OR artist LIKE ? OR album LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+        sql = "SELECT path, song_id, title, artist, album, genre, duration FROM tracks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY artist COLLATE NOCASE, title COLLATE NOCASE"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._competitor(row) for row in self.db.execute(sql, params)]
+
+    @staticmethod
+    def _competitor(row):
+        path, song_id, title, artist, album, genre, duration = row
+        name = title or os.path.splitext(os.path.basename(path))[0]
+        if artist and title:
+            name = f"{artist} - {title}"
+        metadata = {
+            "source_path": path, "artist": artist, "album": album,
+            "genre": genre, "duration": duration,
+        }
+        return Competitor(name, path, song_id, metadata)
+
+    def values(self, field):
+        """Distinct non-empty values of ``artist`` or ``genre``, for filter pickers."""
+        if field not in ("artist", "genre"):
+            raise ValueError(f"Unknown field: {field}")
+        return [
+            value for (value,) in self.db.execute(
+                f"SELECT DISTINCT {field} FROM tracks WHERE {field} IS NOT NULL ORDER BY {field} COLLATE NOCASE"
+            )
+        ]
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -1,14 +1,36 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pygame
-from pytubefix import YouTube
+from playback import Player
 import math
 import os
+import socket
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from bracket import Bracket
 from match import Match
 from competitor import Competitor
+from registry import SongRegistry
+from renderer import BracketRenderer
+from ingest import IngestQueue
+from audio_cache import AudioCache
+from normalize import PLAYBACK_SETTINGS, ImportNormalizer, gain_to_volume
+from previews import PreviewBuilder, is_fresh, preview_path
+from persistence import TournamentStore
+from engine import RATINGS_PATH, STATE_DIR
+from vote_server import VoteServer, VoteService
+from ranking import RankingSession
+from ratings import RatingStore
+from library import LibraryIndex, read_tags
+from fingerprint import FingerprintIndex
+from waveform import WaveformStore
 from styles import configure_styles
-from pydub import AudioSegment
+import profiling
+
+RANKING_PATH = os.path.join(STATE_DIR, "ranking.json")  # Votes of the running full ranking
+LIBRARY_PATH = "library.db"  # Tags of every scanned music folder
+FINGERPRINTS_PATH = "fingerprints.db"  # Acoustic fingerprints of every imported song
+WAVEFORMS_PATH = "waveforms.bin"  # Waveform thumbnails drawn in the match boxes
+TRACE_PATH = "trace.json"  # Chrome trace written by the stats panel
 
 
 
@@ -17,16 +39,20 @@ class MusicTournamentApp:
         self.root = root
         self.root.title("Music Tournament App")
         
-        # Initialize Pygame mixer for audio playback
-        pygame.mixer.init()
+        # Pre-decoded playback, instant switching between songs; pygame loads on first use
+        self.player = Player(wait=False)  # Songs start from poll_playback once decoded
+        self.root.after(50, self.poll_playback)
 
         # Initialize variables
         self.clashes = []  # List to store Clash objects
         self.winners = []  # Initialize winners as an empty list
-        self.songs = []  # List of song names
-        self.songs_paths = []  # List of song file paths
+        self.registry = SongRegistry()  # Songs keyed by stable ID
+        self.current_match = None  # Match currently shown to the voters
         self.tournament = None  # Tournament object to manage rounds
+        self.ranking = None  # RankingSession when ranking every song instead
         self.is_paused = False #Tracks if music is paused
+        self.volume = 0.5  # Slider volume, before the track's loudness gain
+        self.playing = None  # Competitor whose song is loaded in the mixer
 
         # Apply styles using the imported function
         self.style = configure_styles(self.root)
@@ -74,16 +100,39 @@ class MusicTournamentApp:
         self.volume_slider.set(50)  # Set initial volume to 50%
         self.volume_slider.grid(row=5, column=1, pady=5)
 
-        # New YouTube URL entry and download button
-        self.youtube_label = ttk.Label(self.top_frame, text="YouTube URL:")
-        self.youtube_label.grid(row=6, column=0, sticky="w", pady=5)
+        # Preview mode plays each song's precomputed hook clip instead of the whole track
+        self.preview_mode = tk.BooleanVar(value=False)
+        self.preview_check = ttk.Checkbutton(self.top_frame, text="Preview mode", variable=self.preview_mode, command=self.build_previews)
+        self.preview_check.grid(row=8, column=0, columnspan=2, pady=5)
+
+        # Full ranking mode: orders every song with about n*log2(n) votes
+        self.rank_button = ttk.Button(self.top_frame, text="Rank All Songs", command=self.start_ranking)
+        self.rank_button.grid(row=9, column=0, columnspan=2, pady=5)
+
+        # Music library: scan whole folders, then build a field from filtered tracks
+        self.scan_button = ttk.Button(self.top_frame, text="Scan Music Folder", command=self.scan_library)
+        self.scan_button.grid(row=10, column=0, pady=5)
 
-        self.youtube_entry = ttk.Entry(self.top_frame, width=40)
+        self.library_button = ttk.Button(self.top_frame, text="Add From Library", command=self.add_from_library)
+        self.library_button.grid(row=10, column=1, pady=5)
+
+        # YouTube URLs (one per line, videos or playlists) and download button
+        self.youtube_label = ttk.Label(self.top_frame, text="YouTube URLs:")
+        self.youtube_label.grid(row=6, column=0, sticky="nw", pady=5)
+
+        self.youtube_entry = tk.Text(self.top_frame, width=40, height=3)
         self.youtube_entry.grid(row=6, column=1, pady=5)
 
-        self.youtube_button = ttk.Button(self.top_frame, text="Add YouTube Song", command=self.add_youtube_song)
+        self.youtube_button = ttk.Button(self.top_frame, text="Add YouTube Songs", command=self.add_youtube_song)
         self.youtube_button.grid(row=7, column=0, columnspan=2, pady=5)
 
+        # Download progress, one row per queued track
+        self.ingest_listbox = tk.Listbox(self.top_frame, height=4, width=60, selectmode=tk.SINGLE)
+        self.ingest_listbox.grid(row=0, column=2, rowspan=6, sticky="n", padx=10, pady=5)
+
+        self.cancel_download_button = ttk.Button(self.top_frame, text="Cancel Download", command=self.cancel_download)
+        self.cancel_download_button.grid(row=6, column=2, sticky="n", pady=5)
+
 
         # Create control buttons
         control_frame = tk.Frame(root)
@@ -98,6 +147,22 @@ class MusicTournamentApp:
         self.resume_button = ttk.Button(control_frame, text="Resume Song", command=self.resume_song)
         self.resume_button.pack(side=tk.LEFT, padx=5)
 
+        # Audience voting from phones through the local vote server
+        self.audience_button = ttk.Button(control_frame, text="Start Audience Voting", command=self.start_audience_voting)
+        self.audience_button.pack(side=tk.LEFT, padx=5)
+
+        self.close_vote_button = ttk.Button(control_frame, text="Close Vote", command=self.close_audience_vote, state=tk.DISABLED)
+        self.close_vote_button.pack(side=tk.LEFT, padx=5)
+
+        # Resolve the rest of the bracket from an offline vote log
+        self.import_votes_button = ttk.Button(control_frame, text="Import Vote Log", command=self.import_vote_log)
+        self.import_votes_button.pack(side=tk.LEFT, padx=5)
+
+        # Live timings of loads, downloads, transcodes and redraws
+        self.stats_button = ttk.Button(control_frame, text="Stats", command=self.show_stats)
+        self.stats_button.pack(side=tk.LEFT, padx=5)
+        self.stats_window = None
+
         # Create a frame for the canvas (bracket visualization)
         self.bracket_frame = ttk.Frame(root)
         self.bracket_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -114,7 +179,11 @@ class MusicTournamentApp:
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.canvas.config(bg="mediumpurple1")
         
-        self.canvas.config(xscrollcommand=self.h_scrollbar.set, yscrollcommand=self.v_scrollbar.set)
+        # Retained-mode renderer: only visible matches get canvas items
+        self.waveforms = WaveformStore(WAVEFORMS_PATH)
+        self.renderer = BracketRenderer(self.canvas, waveforms=self.waveforms)
+        self.canvas.config(xscrollcommand=self.renderer.scroll_command(self.h_scrollbar),
+                           yscrollcommand=self.renderer.scroll_command(self.v_scrollbar))
         self.h_scrollbar.config(command=self.canvas.xview)
         self.v_scrollbar.config(command=self.canvas.yview)
 
@@ -122,123 +191,325 @@ class MusicTournamentApp:
         self.matches = []
         self.current_round = 0
 
-    
-    def add_youtube_song(self):
-        """Download audio from a YouTube URL and add it as a song."""
-        url = self.youtube_entry.get().strip()
-        if not url:
-            messagebox.showerror("Error", "Please enter a valid YouTube URL.")
-            return
-
-        try:
-            yt = YouTube(url, 'WEB')#Use WEB client to auto-generate the POToken
-            audio_stream = yt.streams.filter(only_audio=True).first()
+        # Uploaded files are converted and loudness-analysed on a process pool
+        self.audio_cache = AudioCache()
+        self.normalizer = ImportNormalizer(self.audio_cache)
+        self.fingerprints = FingerprintIndex(FINGERPRINTS_PATH)  # Catches the same song imported twice
+        self.root.after(100, self.poll_imports)
+
+        # Background YouTube downloads, drained on the Tk thread by poll_ingest.
+        # Downloads are converted by the normalizer in the same single pass.
+        self.ingest = IngestQueue(
+            is_known=lambda song_id: song_id in self.registry,
+            cache=self.audio_cache,
+            transcode=self.normalizer.convert,
+            settings=PLAYBACK_SETTINGS,
+        )
+        self.ingest_rows = []  # Listbox row -> job_id
+        self.ingest_row_of = {}  # job_id -> listbox row
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(100, self.poll_ingest)
 
-            if not audio_stream:
-                messagebox.showerror("Error", "No audio streams found for this video.")
-                return
+        # Hook clips are cut in the background, only for new or changed files
+        self.previews = PreviewBuilder()
 
-            output_dir = "downloads"
-            os.makedirs(output_dir, exist_ok=True)
+        self.vote_service = VoteService()
+        self.vote_server = None  # Started on demand
 
-            # Download the audio
-            file_path = audio_stream.download(output_dir)
-            new_file_path = os.path.splitext(file_path)[0] + ".mp3"
-            # print(new_file_path)
-            
-            # Convert to .mp3 if necessary
-            if not file_path.endswith(".mp3"):
-                os.rename(file_path, new_file_path)
-            
-            # Re-encode the MP3 file
-            # print(f"File path after download: {file_path}")
-            # print(f"File path after renaming to MP3: {new_file_path}")
-            # print(f"File exists: {os.path.exists(new_file_path)}")
-            fixed_file_path = self.reencode_mp3(new_file_path)
-            if fixed_file_path:
-                new_file_path = fixed_file_path
-
-            # Avoid duplicates
-            song_name = yt.title
-            if song_name in self.songs:
-                messagebox.showwarning("Duplicate Song", f"{song_name} is already in the list.")
-                return
+        # Every vote is journaled so a crash or closed window loses nothing
+        self.store = TournamentStore(STATE_DIR)
+        self.ratings = RatingStore(RATINGS_PATH)  # Bradley-Terry strengths used for seeding
 
-            # Append the song and path
-            self.songs.append(song_name)
-            self.songs_paths.append(new_file_path)
-            self.song_listbox.insert(tk.END, song_name)
+        # Library scans run off the Tk thread and are polled by poll_library_scan
+        self.library = LibraryIndex(LIBRARY_PATH)
+        self.scan_executor = ThreadPoolExecutor(max_workers=1)
+        self.library_scan = None  # Future of the running scan
+        if TournamentStore.exists(STATE_DIR):
+            self.root.after(0, self.offer_resume)
 
-            messagebox.showinfo("Success", f"Downloaded and added: {song_name}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to download from YouTube: {e}")
     
-    #move to its own file later
-    def reencode_mp3(self, file_path):
-        try:
-            audio = AudioSegment.from_file(file_path)
-            
-            audio.export(file_path, format="mp3")
-            return file_path
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to re-encode the file: {e}")
-            return None
+    def add_youtube_song(self):
+        """Queue every YouTube URL in the text box for background download."""
+        urls = self.youtube_entry.get("1.0", tk.END).split()
+        if not urls:
+            messagebox.showerror("Error", "Please enter a valid YouTube URL.")
+            return
+        with profiling.span("add_youtube_song", urls=len(urls)):
+            self.ingest.submit(urls)
+        self.youtube_entry.delete("1.0", tk.END)
+
+    def cancel_download(self):
+        """Cancel the download selected in the progress list."""
+        selection = self.ingest_listbox.curselection()
+        if selection:
+            self.ingest.cancel(self.ingest_rows[selection[0]])
+
+    def poll_ingest(self):
+        """Apply download events from the worker pool on the Tk thread."""
+        for kind, job in self.ingest.poll():
+            if kind == "queued":
+                self.ingest_row_of[job.job_id] = len(self.ingest_rows)
+                self.ingest_rows.append(job.job_id)
+                self.ingest_listbox.insert(tk.END, "")
+            elif kind == "done":
+                # Register the song under its video ID
+                self.registry.add(job.title, job.file_path, song_id=job.song_id)
+                self.song_listbox.insert(tk.END, job.title)
+                # Already converted: only the analysis result is picked up
+                self.normalizer.submit_converted(job.song_id, job.file_path, job.meta)
+
+            row = self.ingest_row_of[job.job_id]
+            self.ingest_listbox.delete(row)
+            self.ingest_listbox.insert(row, self.describe_job(job))
+        self.root.after(100, self.poll_ingest)
+
+    def poll_playback(self):
+        """Start a song whose decode finished since the play button was clicked."""
+        for error in self.player.poll():
+            messagebox.showerror("Error", f"Could not play the song: {error}")
+        self.root.after(50, self.poll_playback)
+
+    @staticmethod
+    def describe_job(job):
+        if job.status == "downloading":
+            return f"{job.title}: {job.progress:.0%}"
+        if job.status == "error":
+            return f"{job.title}: failed ({job.error})"
+        if job.status == "duplicate":
+            return f"{job.title}: already in the list"
+        if job.status == "done" and job.cached:
+            return f"{job.title}: done (cached)"
+        return f"{job.title}: {job.status}"
+
+    def poll_imports(self):
+        """Point uploaded songs at their converted file once it is ready."""
+        duplicates = []
+        for kind, job in self.normalizer.poll():
+            if job.song_id not in self.registry:
+                continue  # Removed meanwhile
+            competitor = self.registry.get(job.song_id)
+            if kind == "done":
+                competitor.file_path = job.file_path
+                competitor.metadata["gain_db"] = job.gain_db
+                competitor.metadata["duration"] = job.duration
+                if job.fingerprint is not None and self.drop_if_duplicate(competitor, job.fingerprint):
+                    duplicates.append(competitor.name)
+                elif job.peaks is not None:
+                    self.waveforms.put(job.song_id, job.peaks)
+                    self.renderer.schedule()  # Its match boxes can show the waveform now
+            else:
+                print(f"Could not convert {job.source}, playing it as is: {job.error}")
+        if duplicates:
+            messagebox.showwarning("Duplicate Songs", "Already in the list, not added again:\n" + "\n".join(duplicates))
+        self.root.after(100, self.poll_imports)
+
+    def drop_if_duplicate(self, competitor, fingerprint):
+        """Remove a new song that sounds like one already in the list; True if removed."""
+        matches = [
+            song_id for song_id, _ in self.fingerprints.find_duplicates(fingerprint, exclude=competitor.song_id)
+            if song_id in self.registry
+        ]
+        if not matches or self.in_play(competitor):
+            self.fingerprints.add(competitor.song_id, fingerprint)
+            return False
+        original = self.registry.get(matches[0])
+        print(f"{competitor.name} sounds like {original.name}, skipping it")
+        self.registry.remove(competitor.song_id)
+        self.song_listbox.delete(0, tk.END)
+        for song in self.registry:
+            self.song_listbox.insert(tk.END, song.name)
+        return True
+
+    def in_play(self, competitor):
+        """True if the running tournament or ranking already includes the song."""
+        for session in (self.tournament, self.ranking):
+            if session is not None and any(entrant.song_id == competitor.song_id for entrant in session.competitors):
+                return True
+        return False
+
+    def on_close(self):
+        self.ingest.shutdown()
+        self.normalizer.shutdown()
+        self.player.shutdown()
+        self.previews.shutdown()
+        self.store.close()
+        self.ratings.close()
+        self.fingerprints.close()
+        self.waveforms.close()
+        self.scan_executor.shutdown(wait=False, cancel_futures=True)
+        if self.vote_server:
+            self.vote_server.stop()
+        self.ingest.cache.flush()
+        stats = self.ingest.cache.stats()
+        print(f"Audio cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+        self.root.destroy()
 
     def upload_songs(self):
         """Allow user to upload multiple songs by browsing the file system."""
         file_paths = filedialog.askopenfilenames(
             title="Select Songs",
-            filetypes=(("MP3 files", "*.mp3"), ("All files", "*.*"))
+            filetypes=(("Audio files", "*.mp3 *.wav *.ogg *.flac *.m4a *.aac *.opus"), ("MP3 files", "*.mp3"))
         )
         if not file_paths:
             return
 
         for file_path in file_paths:
-            song_name = os.path.splitext(file_path.split("/")[-1])[0]  # Remove .mp3 extension
-            self.songs.append(song_name)
-            self.songs_paths.append(file_path)  # Store the file path as well
-            self.song_listbox.insert(tk.END, song_name)
-            print(f"Uploaded: {song_name} from {file_path}")
-            
+            tags = read_tags(file_path)
+            song_name = tags["title"] or os.path.splitext(os.path.basename(file_path))[0]  # Remove .mp3 extension
+            if tags["title"] and tags["artist"]:
+                song_name = f"{tags['artist']} - {tags['title']}"
+            if self.add_local_song(song_name, file_path, tags):
+                print(f"Uploaded: {song_name} from {file_path}")
+
+    def add_local_song(self, song_name, file_path, metadata):
+        """Register a song file and queue its conversion; False if it is already known."""
+        song_id = self.registry.make_id(file_path)
+        if song_id in self.registry:
+            return False  # Same file picked twice
+        metadata = dict(metadata, source_path=file_path)  # Previews are cut from the original
+        self.registry.add(song_name, file_path, song_id=song_id, metadata=metadata)
+        self.song_listbox.insert(tk.END, song_name)
+        self.normalizer.submit(song_id, file_path)  # Converted copy replaces file_path when ready
+        return True
+
+    def scan_library(self):
+        """Index every audio file under a folder, re-reading only changed files."""
+        if self.library_scan is not None:
+            return
+        folder = filedialog.askdirectory(title="Select Music Folder")
+        if not folder:
+            return
+        self.scan_button.config(text="Scanning...", state=tk.DISABLED)
+        self.library_button.config(state=tk.DISABLED)
+        self.library_scan = self.scan_executor.submit(self.library.scan, folder)
+        self.root.after(200, self.poll_library_scan)
+
+    def poll_library_scan(self):
+        if not self.library_scan.done():
+            self.root.after(200, self.poll_library_scan)
+            return
+        scan, self.library_scan = self.library_scan, None
+        self.scan_button.config(text="Scan Music Folder", state=tk.NORMAL)
+        self.library_button.config(state=tk.NORMAL)
+        try:
+            stats = scan.result()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Could not scan the folder: {e}")
+            return
+        messagebox.showinfo(
+            "Library Scanned",
+            f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed, "
+            f"{stats['unchanged']} unchanged.\n{len(self.library)} tracks in the library.",
+        )
+
+    def add_from_library(self):
+        """Pick tracks from the library index by artist, genre, length or text."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Add From Library")
+        fields = {}
+        for row, (label, key) in enumerate((("Artist:", "artist"), ("Genre:", "genre"), ("Min length (s):", "min_duration"),
+                                            ("Max length (s):", "max_duration"), ("Search:", "text"))):
+            ttk.Label(dialog, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            if key in ("artist", "genre"):
+                entry = ttk.Combobox(dialog, values=self.library.values(key))
+            else:
+                entry = ttk.Entry(dialog)
+            entry.grid(row=row, column=1, padx=5, pady=2)
+            fields[key] = entry
+
+        def add_matching():
+            filters = {key: entry.get().strip() or None for key, entry in fields.items()}
+            try:
+                for key in ("min_duration", "max_duration"):
+                    if filters[key] is not None:
+                        filters[key] = float(filters[key])
+            except ValueError:
+                messagebox.showerror("Error", "Lengths must be numbers of seconds.", parent=dialog)
+                return
+            tracks = self.library.query(**filters)
+            added = sum(self.add_local_song(track.name, track.file_path, track.metadata) for track in tracks)
+            dialog.destroy()
+            messagebox.showinfo("Add From Library", f"Added {added} of {len(tracks)} matching songs.")
+
+        ttk.Button(dialog, text="Add Songs", command=add_matching).grid(row=5, column=0, columnspan=2, pady=5)
+
     def adjust_volume(self, volume):
         """Adjust the volume of the music."""
-        volume = int(volume) / 100  # Convert to a range between 0 and 1
-        pygame.mixer.music.set_volume(volume)
+        self.volume = int(volume) / 100  # Convert to a range between 0 and 1
+        gain_db = self.playing.metadata.get("gain_db", 0.0) if self.playing else 0.0
+        self.player.set_volume(gain_to_volume(self.volume, gain_db))
 
 
     def stop_song(self):
         """Stop the currently playing song."""
-        pygame.mixer.music.stop()
+        self.player.stop()
         self.is_paused = False
 
     def pause_song(self):
         """Pause the currently playing song."""
         if not self.is_paused:
-            pygame.mixer.music.pause()
+            self.player.pause()
             self.is_paused = True
 
     def resume_song(self):
         """Resume the currently paused song."""
         if self.is_paused:
-            pygame.mixer.music.unpause()
+            self.player.resume()
             self.is_paused = False
 
 
     def start_tournament(self):
-        if len(self.songs) < 2:
+        if len(self.registry) < 2:
             messagebox.showerror("Error", "At least two songs are required to start the tournament.")
             return
-        self.tournament = Bracket(self.songs)  # Create the bracket with uploaded songs
+        self.ranking = None
+        # Create the bracket with uploaded songs, strongest songs seeded apart
+        self.tournament = Bracket(self.registry.competitors(), ratings=self.ratings.ratings())
+        self.store.start(self.tournament)
+        self.renderer.set_bracket(self.tournament)
+        self.build_previews()
         self.matches = self.tournament.rounds[0]  # Initialize matches with the first round's matches
         self.current_round = 0
         self.update_ui()  # Call the centralized UI update
         self.show_match()
 
+    def offer_resume(self):
+        if messagebox.askyesno("Resume Tournament", "An unfinished tournament was found. Resume it?"):
+            self.resume_tournament()
+
+    def resume_tournament(self):
+        """Reload the stored tournament and continue at its first undecided match."""
+        try:
+            self.tournament = self.store.resume()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not resume the tournament: {e}")
+            return
+        for competitor in self.tournament.competitors:
+            if competitor.song_id not in self.registry:
+                self.registry.register(competitor)
+                self.song_listbox.insert(tk.END, competitor.name)
+
+        self.renderer.set_bracket(self.tournament)
+        self.matches = self.tournament.get_current_round_matches()
+        self.current_round = next(
+            (idx for idx, match in enumerate(self.matches) if match.get_winner() is None),
+            len(self.matches),
+        )
+        if self.current_round == len(self.matches):
+            self.current_round -= 1  # The round was complete when the app stopped
+            self.update_ui()
+            self.prepare_next_round()
+        else:
+            self.update_ui()
+
     def show_match(self):
         """Display the next match in the tournament."""
         if self.current_round < len(self.matches):
             # Get the current match
             match = self.matches[self.current_round]
+            if self.current_match is None or (self.current_match.competitor_a, self.current_match.competitor_b) != (match.competitor_a, match.competitor_b):
+                self.player.forget_positions()  # A new match starts both songs from the top
+            self.current_match = match
             
             # Retrieve song names for the match
             song1 = match.competitor_a.name if match.competitor_a else "TBD"
@@ -251,51 +522,197 @@ class MusicTournamentApp:
             self.vote_button2.config(text=f"Vote for {song2}",state=tk.NORMAL)
             self.play_song1_button.config(state=tk.NORMAL)
             self.play_song2_button.config(state=tk.NORMAL)
-
-            # Get the file paths for the songs (use the list of file paths)
-            song1_path = self.songs_paths[self.songs.index(song1)] if song1 != "TBD" else None
-            song2_path = self.songs_paths[self.songs.index(song2)] if song2 != "TBD" else None
-
-            self.current_songs = (song1_path, song2_path)
+            self.open_audience_vote()
+
+            # Decode this match and the next one in the background
+            upcoming = [match]
+            if self.current_round + 1 < len(self.matches):
+                upcoming.append(self.matches[self.current_round + 1])
+            self.player.prefetch(
+                self.playback_path(competitor)
+                for upcoming_match in upcoming
+                for competitor in (upcoming_match.competitor_a, upcoming_match.competitor_b)
+                if competitor
+            )
 
     def play_song1(self):
-        song1_path, _ = self.current_songs
-        if song1_path and os.path.exists(song1_path):  # Ensure file exists
-            pygame.mixer.music.load(song1_path)
-            pygame.mixer.music.play()
-        else:
-            messagebox.showerror("Error", "Song file not found!")
+        self.play_competitor(self.current_match.competitor_a if self.current_match else None)
 
     def play_song2(self):
-        _, song2_path = self.current_songs
-        if song2_path and os.path.exists(song2_path):  # Ensure file exists
-            pygame.mixer.music.load(song2_path)
-            pygame.mixer.music.play()
+        self.play_competitor(self.current_match.competitor_b if self.current_match else None)
+
+    def build_previews(self):
+        """In preview mode, queue hook clips for every song that lacks an up-to-date one."""
+        if not self.preview_mode.get():
+            return
+        sources = (competitor.metadata.get("source_path") for competitor in self.registry)
+        self.previews.submit(source for source in sources if source)
+
+    def playback_path(self, competitor):
+        """File to play for a contestant: its preview in preview mode, if it is ready."""
+        # Look the file path up by song ID, it changes once the import finishes
+        registered = self.registry.get(competitor.song_id) if competitor.song_id in self.registry else competitor
+        # Previews sit next to the uploaded file, never in the audio cache, whose
+        # size limit and eviction do not know about them. Downloads have no
+        # such file and always play whole.
+        source = registered.metadata.get("source_path")
+        if self.preview_mode.get() and source and is_fresh(source):
+            return preview_path(source)
+        return registered.file_path
+
+    def play_competitor(self, competitor):
+        """Play a contestant's song at the slider volume plus its loudness gain."""
+        song_path = self.playback_path(competitor) if competitor else None
+        if song_path and os.path.exists(song_path):  # Ensure file exists
+            self.playing = competitor
+            self.is_paused = False
+            with profiling.span("play_song", song=competitor.name):
+                self.player.play(song_path, gain_to_volume(self.volume, competitor.metadata.get("gain_db", 0.0)))
         else:
             messagebox.showerror("Error", "Song file not found!")
 
 
     def vote_for_song_1(self):
         """Vote for Song 1 as the winner of the current match."""
-        winner_song = self.song1_label.cget("text").split(": ")[1]
-        self.update_bracket_after_vote(winner_song)
+        self.update_bracket_after_vote(self.current_match.competitor_a)
 
     def vote_for_song_2(self):
         """Vote for Song 2 as the winner of the current match."""
-        winner_song = self.song2_label.cget("text").split(": ")[1]
-        self.update_bracket_after_vote(winner_song)
+        self.update_bracket_after_vote(self.current_match.competitor_b)
 
-    def update_bracket_after_vote(self, winner_song):
-        """Update the bracket after a vote."""
-        current_match = self.matches[self.current_round]
+    def start_audience_voting(self):
+        """Start the vote server so the audience can vote from their phones."""
+        if self.vote_server:
+            return
+        self.vote_server = VoteServer(self.vote_service)
+        try:
+            self.vote_server.start()
+        except OSError as e:
+            self.vote_server = None
+            messagebox.showerror("Error", f"Could not start the vote server: {e}")
+            return
+        self.audience_button.config(text="Audience Voting On", state=tk.DISABLED)
+        self.close_vote_button.config(state=tk.NORMAL)
+        host = socket.gethostbyname(socket.gethostname())
+        messagebox.showinfo("Audience Voting", f"Voters can open http://{host}:{self.vote_server.port}/")
+        self.open_audience_vote()
+        self.root.after(250, self.poll_votes)
+
+    def open_audience_vote(self):
+        """Put the match on screen up for audience voting."""
+        match = self.current_match
+        if not self.vote_server or not match or not match.competitor_a or not match.competitor_b:
+            return
+        match_key = f"{match.competitor_a.song_id}|{match.competitor_b.song_id}"
+        if match_key != self.vote_service.match_key:
+            self.vote_service.open_match(match_key, (match.competitor_a.name, match.competitor_b.name))
+
+    def poll_votes(self):
+        """Show the live audience counts next to the songs."""
+        if self.vote_service.is_open and self.current_match:
+            votes1, votes2 = self.vote_service.counts()
+            self.song1_label.config(text=f"Song 1: {self.current_match.competitor_a.name} ({votes1} votes)")
+            self.song2_label.config(text=f"Song 2: {self.current_match.competitor_b.name} ({votes2} votes)")
+        self.root.after(250, self.poll_votes)
+
+    def close_audience_vote(self):
+        """Decide the match on screen by the audience's votes (ties go to song 1)."""
+        if not self.vote_service.is_open or not self.current_match:
+            return
+        votes1, votes2 = self.vote_service.close_match()
+        winner = self.current_match.competitor_a if votes1 >= votes2 else self.current_match.competitor_b
+        self.update_bracket_after_vote(winner)
 
-        if current_match.competitor_a.name == winner_song:
-            current_match.set_winner(current_match.competitor_a)
-        elif current_match.competitor_b.name == winner_song:
-            current_match.set_winner(current_match.competitor_b)
-        else:
+    def import_vote_log(self):
+        """Decide every remaining match from a CSV or JSON Lines vote log."""
+        if not self.tournament:
+            messagebox.showerror("Error", "Start a tournament first.")
+            return
+        path = filedialog.askopenfilename(
+            title="Select Vote Log",
+            filetypes=(("Vote logs", "*.csv *.jsonl *.ndjson *.json"),)
+        )
+        if not path:
+            return
+        undecided = self.tournament.undecided()
+        try:
+            rounds = self.tournament.resolve_from_votes(path)
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            messagebox.showerror("Error", f"Could not read the vote log: {e}")
+            return
+        self.ratings.record_many(self.tournament.results(undecided))
+        self.ratings.update()
+        self.matches = rounds[-1]
+        self.current_round = len(self.matches) - 1
+        self.current_match = self.matches[self.current_round]
+        self.prepare_next_round()  # Announces the winner
+
+    def start_ranking(self):
+        """Rank every song through a stream of pairwise votes."""
+        if len(self.registry) < 2:
+            messagebox.showerror("Error", "At least two songs are required to rank them.")
+            return
+        self.ranking = None
+        if os.path.exists(RANKING_PATH):
+            saved = RankingSession.load(RANKING_PATH, self.registry)
+            if saved and not saved.is_done() and messagebox.askyesno("Resume Ranking", f"Resume the ranking after {saved.votes_used} votes?"):
+                self.ranking = saved
+        if self.ranking is None:
+            self.ranking = RankingSession(self.registry.competitors())
+            os.makedirs(STATE_DIR, exist_ok=True)
+            self.ranking.save(RANKING_PATH)
+
+        self.tournament = None
+        self.renderer.set_bracket(None)
+        self.show_ranking_match()
+
+    def show_ranking_match(self):
+        """Show the next comparison of the ranking, or the result once it is complete."""
+        match = self.ranking.next_match()
+        if match:
+            self.matches = [match]
+            self.current_round = 0
+            self.show_match()
+            return
+
+        self.ratings.update()
+        report = self.ranking.report()
+        ranked = self.ranking.ranking()
+        top = "\n".join(f"{position}. {competitor.name}" for position, competitor in enumerate(ranked[:10], start=1))
+        messagebox.showinfo(
+            "Ranking Complete",
+            f"{top}\n\nUsed {report['votes_used']} votes for {report['songs']} songs "
+            f"(at least {report['theoretical_minimum']} are needed in the worst case).",
+        )
+        self.ranking = None
+        os.remove(RANKING_PATH)
+
+        # Nothing left to vote on
+        self.current_match = None
+        self.matches = []
+        self.current_round = 0
+        if self.vote_service.is_open:
+            self.vote_service.close_match()
+        for button in (self.vote_button1, self.vote_button2, self.play_song1_button, self.play_song2_button):
+            button.config(state=tk.DISABLED)
+
+    def update_bracket_after_vote(self, winner):
+        """Update the bracket after a vote."""
+        if self.tournament is None and self.ranking is None:
+            return  # A finished ranking leaves nothing to vote on
+        try:
+            self.current_match.set_winner(winner)
+        except ValueError:
             messagebox.showerror("Error", "Invalid vote.")
             return
+        loser = self.current_match.competitor_b if winner is self.current_match.competitor_a else self.current_match.competitor_a
+        self.ratings.record(winner, loser)
+
+        if self.ranking:
+            self.ranking.record(winner)
+            self.ranking.save(RANKING_PATH)
+            self.show_ranking_match()
+            return
 
         # Advance to the next match
         if self.current_round + 1 < len(self.matches):
@@ -307,12 +724,14 @@ class MusicTournamentApp:
 
     def prepare_next_round(self):
         """Prepare the next round."""
+        self.ratings.update()  # Fold the finished round into the song ratings
         next_round_matches = self.tournament.advance_to_next_round()
         if not next_round_matches:
             # Tournament is complete, show the winner
             final_match = self.tournament.rounds[-1][0]  # Get the final match
             winner = final_match.get_winner().name if final_match.get_winner() else "TBD"
             messagebox.showinfo("Tournament Winner", f"The winner is: {winner}")
+            self.store.clear()  # Nothing left to resume
             self.update_ui()  # Update UI after a vote
             return
         
@@ -323,68 +742,57 @@ class MusicTournamentApp:
 
     def update_bracket(self):
         """Update the bracket visualization after a song wins."""
-        self.canvas.delete("all")
         self.draw_bracket()
 
     def update_ui(self):
         self.show_match()  # Show the current match
         self.draw_bracket()  # Redraw the bracket
 
-    def draw_bracket(self):
-        """Draw the bracket on the canvas based on the current tournament state."""
-        print("Drawing the bracket...")  # Debugging statement
-        self.canvas.delete("all")  # Clear the canvas
-
-        if not self.tournament:
+    def show_stats(self):
+        """Open the live stats panel; profiling runs while it is open."""
+        if self.stats_window is not None:
+            self.stats_window.lift()
             return
+        profiling.enable()
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("Stats")
+        self.stats_text = tk.Text(self.stats_window, width=80, height=20, font=("Courier", 10))
+        self.stats_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        buttons = ttk.Frame(self.stats_window)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Export Trace", command=self.export_trace).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Reset", command=profiling.reset).pack(side=tk.LEFT, padx=5)
+        self.stats_window.protocol("WM_DELETE_WINDOW", self.close_stats)
+        self.update_stats()
+
+    def update_stats(self):
+        if self.stats_window is None:
+            return
+        recorded = profiling.stats()
+        lines = [f"{'span':<32}{'calls':>7}{'mean ms':>10}{'max ms':>10}{'total s':>10}"]
+        for name, span in sorted(recorded["spans"].items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{name:<32}{span['count']:>7}{span['mean'] * 1e3:>10.2f}"
+                         f"{span['max'] * 1e3:>10.2f}{span['total']:>10.3f}")
+        lines.append("")
+        lines.extend(f"{name:<32}{value:>7}" for name, value in sorted(recorded["counters"].items()))
+        self.stats_text.delete("1.0", tk.END)
+        self.stats_text.insert("1.0", "\n".join(lines))
+        self.root.after(500, self.update_stats)
+
+    def export_trace(self):
+        events = profiling.export_trace(TRACE_PATH)
+        messagebox.showinfo("Trace Exported", f"Wrote {events} events to {os.path.abspath(TRACE_PATH)}\n"
+                            "Open it in chrome://tracing or ui.perfetto.dev.", parent=self.stats_window)
+
+    def close_stats(self):
+        profiling.disable()
+        self.stats_window.destroy()
+        self.stats_window = None
 
-        # Constants for drawing
-        round_spacing = 200  # Space between rounds
-        match_spacing = 80   # Space between matches within a round
-        box_width = 150      # Width of each match box
-        box_height = 30      # Height of each match box
-        start_x = 50         # Starting x-coordinate for the first round
-        start_y = 50         # Starting y-coordinate
-
-        # Calculate the canvas scrollregion dynamically
-        max_x = start_x + round_spacing * len(self.tournament.rounds)
-        max_y = start_y + match_spacing * max(len(round_matches) for round_matches in self.tournament.rounds)
-        self.canvas.config(scrollregion=(0, 0, max_x + 100, max_y + 100))
-
-
-        for round_idx, round_matches in enumerate(self.tournament.rounds):
-            x = start_x + round_idx * round_spacing  # X-coordinate for the current round
-
-            for match_idx, match in enumerate(round_matches):
-                # Calculate the y-coordinate for this match
-                y = start_y + match_idx * match_spacing
-
-                # Get competitors' names
-                competitor_a_name = match.competitor_a.name if match.competitor_a else "TBD"
-                competitor_b_name = match.competitor_b.name if match.competitor_b else "TBD"
-                winner_name = match.get_winner().name if match.get_winner() else "TBD"
-
-                # Draw boxes for the competitors
-                self.canvas.create_rectangle(x, y, x + box_width, y + box_height, outline="black", fill="lightblue")
-                self.canvas.create_text(x + 5, y + box_height // 2, text=competitor_a_name, anchor="w")
-
-                self.canvas.create_rectangle(x, y + box_height + 10, x + box_width, y + 2 * box_height + 10, outline="black", fill="lightcoral")
-                self.canvas.create_text(x + 5, y + box_height + 10 + box_height // 2, text=competitor_b_name, anchor="w")
-
-                # If this is not the last round, draw lines to the next round
-                if round_idx + 1 < len(self.tournament.rounds):
-                    next_x = x + round_spacing
-                    next_match_idx = match_idx // 2
-                    next_y = start_y + next_match_idx * match_spacing + box_height // 2
-                    mid_y = y + box_height + 5  # Midpoint of the current match
-
-                    # Draw connecting lines
-                    self.canvas.create_line(x + box_width, mid_y, next_x, next_y, fill="black")
-                    self.canvas.create_line(x + box_width, mid_y + box_height, next_x, next_y, fill="black")
-
-                # Draw winner information
-                if round_idx + 1 == len(self.tournament.rounds):  # If this is the last round
-                    self.canvas.create_text(x + box_width + 20, y + box_height // 2 + 10, text=f"Winner: {winner_name}", anchor="w", fill="gold")
+    def draw_bracket(self):
+        """Schedule a redraw of the bracket; repeated calls collapse into one idle update."""
+        profiling.count("draw_bracket.requests")
+        self.renderer.schedule()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -12,4 +12,30 @@ class Match:
 
     def get_winner(self):
         """Get the winner of the match."""
-        return self.winner
\ No newline at end of file
+        return self.winner
+
+class BracketMatch(Match):
+    """A match backed by a slot of a ``BracketTree`` instead of its own fields."""
+
+    def __init__(self, bracket, node):
+        self.bracket = bracket
+        self.node = node
+
+    @property
+    def competitor_a(self):
+        return self.bracket.competitor_at(2 * self.node)
+
+    @property
+    def competitor_b(self):
+        return self.bracket.competitor_at(2 * self.node + 1)
+
+    @property
+    def winner(self):
+        return self.bracket.competitor_at(self.node)
+
+    def set_winner(self, winner):
+        """Set the winner of the match."""
+        if winner is None or winner not in [self.competitor_a, self.competitor_b]:
+            raise ValueError("Winner must be one of the competitors")
+        side = 0 if winner is self.competitor_a else 1
+        self.bracket.set_winner(self.node, side)
@@ -0,0 +1,181 @@
+import math
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import profiling
+from audio_cache import AudioCache, file_digest
+from fingerprint import fingerprint_segment
+from ingest import drain
+from waveform import peaks_segment
+
+# One playback-friendly format for every imported track
+PLAYBACK_SETTINGS = {"format": "mp3", "frame_rate": 44100, "channels": 2, "bitrate": "192k", "version": 1}
+TARGET_DBFS = -16.0  # Loudness every track is brought to at playback
+
+
+def convert_and_measure(src_path, dst_path):
+    """Process-pool worker: convert a file to PLAYBACK_SETTINGS and measure it.
+
+    Returns the metadata stored with the converted file: its loudness in
+    dBFS (None for silence), its duration and ``analyse_segment``'s results,
+    plus ``"timings"``, the ``(span name, seconds)`` of each stage, which
+    the caller passes to ``record_timings`` rather than storing.
+    """
+    from pydub import AudioSegment
+
+    started = time.perf_counter()
+    audio = AudioSegment.from_file(src_path)
+    audio = audio.set_frame_rate(PLAYBACK_SETTINGS["frame_rate"]).set_channels(PLAYBACK_SETTINGS["channels"])
+    decoded = time.perf_counter()
+    audio.export(dst_path, format=PLAYBACK_SETTINGS["format"], bitrate=PLAYBACK_SETTINGS["bitrate"])
+    encoded = time.perf_counter()
+    loudness = audio.dBFS
+    meta = {"dbfs": loudness if math.isfinite(loudness) else None, "duration": audio.duration_seconds}
+    meta.update(analyse_segment(audio))  # Reuses the decoded audio
+    meta["timings"] = [
+        ("normalize.decode", decoded - started),
+        ("normalize.reencode", encoded - decoded),
+        ("normalize.analyse", time.perf_counter() - encoded),
+    ]
+    return meta
+
+
+def analyse_segment(audio):
+    """Acoustic fingerprint and waveform thumbnail of a decoded track, as hex."""
+    return {"fingerprint": fingerprint_segment(audio).hex(), "peaks": peaks_segment(audio).hex()}
+
+
+def analyse_file(path):
+    """Process-pool worker: ``analyse_segment`` for a file, with ``"timings"``."""
+    from pydub import AudioSegment
+
+    started = time.perf_counter()
+    audio = AudioSegment.from_file(path)
+    decoded = time.perf_counter()
+    result = analyse_segment(audio)
+    result["timings"] = [
+        ("normalize.decode", decoded - started),
+        ("normalize.analyse", time.perf_counter() - decoded),
+    ]
+    return result
+
+
+def record_timings(timings, finished, **args):
+    """Add a worker's stage timings to the trace, back to back, ending at ``finished``.
+
+    Worker processes keep their own clocks and profiler state, so their
+    stages are re-recorded here by the thread that waited for them.
+    """
+    start = finished - sum(seconds for _, seconds in timings)
+    for name, seconds in timings:
+        profiling.add_span(name, start, seconds, **args)
+        start += seconds
+
+
+def gain_to_volume(volume, gain_db):
+    """Mixer volume (0..1) for a slider ``volume`` (0..1) and a track gain in dB."""
+    return max(0.0, min(1.0, volume * 10 ** (gain_db / 20)))
+
+
+class ImportJob:
+    """One uploaded file going through conversion and loudness analysis."""
+
+    def __init__(self, song_id, source):
+        self.song_id = song_id
+        self.source = source
+        self.file_path = None
+        self.gain_db = 0.0
+        self.duration = None
+        self.fingerprint = None  # See fingerprint.fingerprint_samples
+        self.peaks = None  # See waveform.compute_peaks
+        self.cached = False
+        self.status = "queued"  # queued, done, error
+        self.error = None
+
+
+class ImportNormalizer:
+    """Convert and analyse uploaded files on a process pool, one per core.
+
+    Decoding and loudness analysis run in worker processes. A thread per
+    worker hashes the source, consults the audio cache and publishes the
+    converted file, so files seen before cost a hash and nothing else.
+    Results are posted as ``(kind, job)`` tuples on ``events`` for the Tk
+    thread to drain, like ``IngestQueue``.
+    """
+
+    def __init__(self, cache=None, max_workers=None, target_dbfs=TARGET_DBFS):
+        self.cache = cache if cache is not None else AudioCache()
+        self.target_dbfs = target_dbfs
+        self.events = queue.Queue()
+        max_workers = max_workers or os.cpu_count() or 1
+        self._processes = ProcessPoolExecutor(max_workers=max_workers)
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import")
+
+    def submit(self, song_id, file_path):
+        job = ImportJob(song_id, file_path)
+        self._threads.submit(self._run, job)
+        return job
+
+    def submit_converted(self, song_id, file_path, meta):
+        """Analyse a file already converted by ``convert`` (e.g. by ``IngestQueue``).
+
+        ``meta`` is what ``convert`` returned, so the file is not converted
+        or cached again; it is only decoded if ``meta`` lacks the analysis.
+        """
+        job = ImportJob(song_id, file_path)
+        job.file_path = file_path
+        self._threads.submit(self._run, job, dict(meta))
+        return job
+
+    def convert(self, src_path, dst_path):
+        """Convert a file to PLAYBACK_SETTINGS on the process pool; returns its metadata.
+
+        Blocks the calling thread until done. Fits ``IngestQueue``'s ``transcode``.
+        """
+        result = self._processes.submit(convert_and_measure, src_path, dst_path).result()
+        record_timings(result.pop("timings"), time.perf_counter(), source=src_path)
+        return result
+
+    def poll(self, limit=100):
+        """Return up to ``limit`` pending events without blocking."""
+        return drain(self.events, limit)
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, meta=None):
+        try:
+            if meta is None:
+                meta = self._convert_cached(job)
+            loudness = meta.get("dbfs")
+            job.gain_db = self.target_dbfs - loudness if loudness is not None else 0.0  # Silence stays as is
+            job.duration = meta.get("duration")
+            if "fingerprint" not in meta or "peaks" not in meta:  # Cached by an older version
+                result = self._processes.submit(analyse_file, job.file_path).result()
+                record_timings(result.pop("timings"), time.perf_counter(), source=job.source)
+                meta = dict(meta, **result)
+            job.fingerprint = bytes.fromhex(meta["fingerprint"])
+            job.peaks = bytes.fromhex(meta["peaks"])
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        self.events.put((job.status, job))
+
+    def _convert_cached(self, job):
+        with profiling.span("normalize.hash", source=job.source):
+            source_key = file_digest(job.source)
+        found = self.cache.lookup(source_key, PLAYBACK_SETTINGS)
+        if found is not None:
+            job.file_path, meta = found
+            job.cached = True
+            profiling.count("normalize.cache_hits")
+            return meta
+        meta = {}
+        job.file_path = self.cache.store(
+            source_key, lambda tmp_path: meta.update(self.convert(job.source, tmp_path)), PLAYBACK_SETTINGS, meta=meta
+        )
+        return meta
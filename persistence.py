@@ -0,0 +1,241 @@
+import json
+import os
+import struct
+import time
+from array import array
+
+from bracket import Bracket
+from competitor import Competitor
+
+SNAPSHOT_VERSION = 2  # 1 always held the entrants; 2 may leave them to an entrants file
+RECORD = struct.Struct("<ii")  # (node, value); node 0 means "advanced to round <value>"
+
+
+def write_snapshot(bracket, path, journal=None, entrants=True):
+    """Atomically write a bracket as a JSON header line plus its raw slot array.
+
+    ``journal`` is stored in the header so a resume knows which journal
+    file (and from which byte) holds the votes cast after the snapshot.
+    With ``entrants=False`` the competitors are left out (they are stored
+    once with ``write_entrants``), so the snapshot is only the tree state.
+    """
+    header = {"version": SNAPSHOT_VERSION, "current_round": bracket.current_round, "journal": journal}
+    if entrants:
+        header["entrants"] = [_entrant_record(bracket.competitor(idx)) for idx in range(len(bracket.competitors))]
+    _write_atomic(path, json.dumps(header).encode("utf-8") + b"\n", bracket.tree.slots.tobytes())
+
+
+def read_snapshot(path, competitors=None):
+    """Return ``(bracket, journal)`` from a file written by ``write_snapshot``.
+
+    ``competitors`` is required for snapshots written without entrants.
+    """
+    with open(path, "rb") as f:
+        header = json.loads(f.readline())
+        if header.get("version") not in (1, SNAPSHOT_VERSION):
+            raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+        slots = array("i")
+        slots.frombytes(f.read())
+    if "entrants" in header:
+        competitors = [_entrant(entrant) for entrant in header["entrants"]]
+    elif competitors is None:
+        raise ValueError(f"{path} holds no entrants")
+    return Bracket.restore(competitors, slots, header["current_round"]), header["journal"]
+
+
+def write_entrants(competitors, path):
+    """Atomically write the entrant list of a tournament as JSON."""
+    records = [_entrant_record(competitor) for competitor in competitors]
+    _write_atomic(path, json.dumps(records).encode("utf-8"))
+
+
+def read_entrants(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [_entrant(entrant) for entrant in json.load(f)]
+
+
+def _write_atomic(path, *chunks):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _entrant(record):
+    return Competitor(record["name"], record["file_path"], record["song_id"], record["metadata"])
+
+
+def _entrant_record(competitor):
+    return {
+        "name": competitor.name,
+        "file_path": competitor.file_path,
+        "song_id": competitor.song_id,
+        "metadata": competitor.metadata,
+    }
+
+
+class VoteJournal:
+    """Append-only file of fixed-size vote records.
+
+    Every record is handed to the OS right away, so it survives the app
+    crashing. ``fsync`` (which it takes to survive a power loss) is batched:
+    it runs every ``sync_every`` records or ``sync_interval`` seconds.
+    """
+
+    def __init__(self, path, sync_every=32, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._file = open(path, "ab")
+        # Drop a record torn by a crash mid-write
+        size = self._file.tell()
+        if size % RECORD.size:
+            self._file.truncate(size - size % RECORD.size)
+
+    def append(self, node, value):
+        self._file.write(RECORD.pack(node, value))
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+    @staticmethod
+    def read(path, offset=0):
+        """Yield ``(node, value)`` records stored after byte ``offset``."""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        usable = len(data) - len(data) % RECORD.size
+        yield from RECORD.iter_unpack(data[:usable])
+
+
+class TournamentStore:
+    """Crash-safe storage of one tournament in a directory.
+
+    The entrants are written once, when the tournament starts. Votes go to
+    an append-only journal. Every ``snapshot_every`` records the tree slots
+    and current round are snapshotted and a fresh journal generation is
+    started, so a resume loads the last snapshot and replays only the
+    journal tail written after it.
+    """
+
+    def __init__(self, directory, snapshot_every=256):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.snapshot_path = os.path.join(directory, "snapshot.bin")
+        self.entrants_path = os.path.join(directory, "entrants.json")
+        self.bracket = None
+        self.journal = None
+        self.generation = 0
+        self._since_snapshot = 0
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, "snapshot.bin"))
+
+    def start(self, bracket):
+        """Begin storing a new tournament, replacing any previous one."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.close()
+        self.bracket = bracket
+        self.generation = self._latest_generation()
+        if os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)  # Never pair the new entrants with the old tree
+        write_entrants(map(bracket.competitor, range(len(bracket.competitors))), self.entrants_path)
+        self.snapshot()
+        bracket.journal = self
+
+    def resume(self):
+        """Load the stored tournament and return its bracket."""
+        competitors = read_entrants(self.entrants_path) if os.path.exists(self.entrants_path) else None
+        bracket, journal = read_snapshot(self.snapshot_path, competitors)
+        self.generation = journal["generation"]
+        replayed = 0
+        for node, value in VoteJournal.read(self._journal_path(self.generation), journal["offset"]):
+            if node == 0:
+                bracket.current_round = value
+            else:
+                bracket.tree.set_winner(node, value)
+            replayed += 1
+        self.bracket = bracket
+        if competitors is None:
+            # Stored before entrants had their own file: move them there
+            write_entrants(map(bracket.competitor, range(len(bracket.competitors))), self.entrants_path)
+            self.snapshot()
+        else:
+            # Keep appending to the current journal, a snapshot follows once it is long
+            self.journal = VoteJournal(self._journal_path(self.generation))
+            self._since_snapshot = replayed
+        bracket.journal = self
+        return bracket
+
+    def record(self, node, value):
+        """Called by the bracket for every vote and round change."""
+        self.journal.append(node, value)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write a snapshot and switch to a new, empty journal generation."""
+        if self.journal is not None:
+            self.journal.close()
+        self.generation += 1
+        # The snapshot points at the new journal before it exists, so a crash
+        # in between resumes from the snapshot with an empty tail.
+        write_snapshot(self.bracket, self.snapshot_path, {"generation": self.generation, "offset": 0}, entrants=False)
+        self.journal = VoteJournal(self._journal_path(self.generation))
+        self._since_snapshot = 0
+        for name in os.listdir(self.directory):
+            if name.startswith("journal-") and name != os.path.basename(self._journal_path(self.generation)):
+                os.remove(os.path.join(self.directory, name))  # Folded into the snapshot
+
+    def flush(self):
+        if self.journal is not None:
+            self.journal.sync()
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.bracket is not None:
+            self.bracket.journal = None
+
+    def clear(self):
+        """Forget the stored tournament (e.g. once it has a winner)."""
+        self.close()
+        for name in os.listdir(self.directory):
+            if name in ("snapshot.bin", "entrants.json") or name.startswith("journal-"):
+                os.remove(os.path.join(self.directory, name))
+
+    def _journal_path(self, generation):
+        return os.path.join(self.directory, f"journal-{generation}.bin")
+
+    def _latest_generation(self):
+        generations = [
+            int(name[len("journal-"):-len(".bin")])
+            for name in os.listdir(self.directory)
+            if name.startswith("journal-") and name.endswith(".bin")
+        ]
+        return max(generations, default=0)
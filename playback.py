@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import profiling
+from ingest import drain
+
+
+def decode_pcm(file_path, frequency, sample_width, channels):
+    """Decode a file to raw PCM matching the mixer's format."""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(file_path)
+    audio = audio.set_frame_rate(frequency).set_channels(channels).set_sample_width(sample_width)
+    return audio.raw_data
+
+
+class DecodedCache:
+    """Memory-bounded LRU of decoded PCM buffers, keyed by file path."""
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        with self._lock:
+            data = self._buffers.get(file_path)
+            if data is not None:
+                self._buffers.move_to_end(file_path)
+            return data
+
+    def put(self, file_path, data):
+        if len(data) > self.max_bytes:
+            return  # Would evict everything else; play it without caching
+        with self._lock:
+            old = self._buffers.pop(file_path, None)
+            if old is not None:
+                self.size -= len(old)
+            self._buffers[file_path] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._buffers.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __contains__(self, file_path):
+        with self._lock:
+            return file_path in self._buffers
+
+
+class Player:
+    """Plays pre-decoded songs so switching contestants is instant.
+
+    Songs are decoded in the background (``prefetch``) into a
+    ``DecodedCache``. Each song remembers where it was left, so flipping
+    between the two songs of a match resumes each at the same position.
+    pygame and its mixer are only loaded once a song is first needed.
+
+    With ``wait=False``, ``play`` never waits for a decode: finished
+    decodes are posted on ``ready`` and the song starts from ``poll``,
+    which the UI calls from its own thread, like ``IngestQueue.poll``.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, max_workers=2, wait=True):
+        self.mixer = None  # pygame.mixer, set up by _init_mixer
+        self.frequency = self.sample_width = self.channels = self.bytes_per_second = None
+
+        self.cache = DecodedCache(max_bytes)
+        self.positions = {}  # file_path -> seconds already played
+        self._pending = {}  # file_path -> decode future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decode")
+
+        self.wait = wait
+        self.ready = queue.Queue()  # (file_path, future) of decodes play() is waiting for
+        self._requested = None  # Path of the song play() was last asked for
+
+        self.channel = None
+        self.current_path = None
+        self.volume = 1.0
+        self._started_at = 0.0  # monotonic time matching position 0 of the song
+        self._paused_at = None
+
+    def prefetch(self, file_paths):
+        """Start decoding songs that are about to be played."""
+        self._init_mixer()
+        for file_path in file_paths:
+            if file_path:
+                self._decode_async(file_path)
+
+    @profiling.instrument("player.play")
+    def play(self, file_path, volume=None):
+        """Play a song from where it was last left (or from the start)."""
+        if volume is not None:
+            self.volume = volume
+        self._init_mixer()
+        self._requested = file_path
+        future = self._decode_async(file_path)
+        if future.done() or self.wait:
+            self._start(file_path, future.result())
+        else:
+            future.add_done_callback(lambda done: self.ready.put((file_path, done)))
+
+    def poll(self):
+        """Start the requested song if its decode finished; returns decode errors.
+
+        Only call this from the thread that calls ``play``.
+        """
+        errors = []
+        for file_path, future in drain(self.ready):
+            if self._requested != file_path:
+                continue  # Another song was asked for, or playback stopped
+            self._requested = None
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+            else:
+                self._start(file_path, future.result())
+        return errors
+
+    def set_volume(self, volume):
+        self.volume = volume
+        if self.channel is not None:
+            self.channel.set_volume(volume)
+
+    def pause(self):
+        if self.channel is not None and self._paused_at is None:
+            self.channel.pause()
+            self._paused_at = time.monotonic()
+
+    def resume(self):
+        if self.channel is not None and self._paused_at is not None:
+            self.channel.unpause()
+            self._started_at += time.monotonic() - self._paused_at
+            self._paused_at = None
+
+    def stop(self):
+        self._requested = None  # Also drops a song still being decoded
+        if self.channel is not None:
+            self.channel.stop()
+        if self.current_path is not None:
+            self.positions.pop(self.current_path, None)
+        self.channel = None
+        self.current_path = None
+
+    def position(self):
+        """Seconds played of the current song."""
+        if self.current_path is None:
+            return 0.0
+        now = self._paused_at if self._paused_at is not None else time.monotonic()
+        return now - self._started_at
+
+    def forget_positions(self):
+        """Start every song from the beginning again (e.g. for a new match)."""
+        self.positions.clear()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _init_mixer(self):
+        if self.mixer is not None:
+            return
+        import pygame
+
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        frequency, size, channels = pygame.mixer.get_init()
+        self.frequency = frequency
+        self.sample_width = abs(size) // 8
+        self.channels = channels
+        self.bytes_per_second = frequency * self.sample_width * channels
+        self.mixer = pygame.mixer
+
+    def _start(self, file_path, data):
+        self._remember_position()
+        frame = self.sample_width * self.channels
+        offset = int(self.positions.get(file_path, 0.0) * self.bytes_per_second) // frame * frame
+        if offset >= len(data):
+            offset = 0  # It had finished, start over
+        sound = self.mixer.Sound(buffer=memoryview(data)[offset:])
+
+        if self.channel is not None:
+            self.channel.stop()
+        self.channel = sound.play()
+        self.channel.set_volume(self.volume)
+        self.current_path = file_path
+        self._started_at = time.monotonic() - offset / self.bytes_per_second
+        self._paused_at = None
+
+    def _remember_position(self):
+        if self.current_path is not None:
+            self.positions[self.current_path] = self.position()
+
+    def _decode_async(self, file_path):
+        """Return a future for the decoded PCM of a song, decoding it at most once."""
+        with self._lock:
+            future = self._pending.get(file_path)
+            if future is not None:
+                return future
+            data = self.cache.get(file_path)
+            if data is not None:
+                profiling.count("player.decoded_cache_hits")
+                future = Future()  # Already decoded, no need to queue behind prefetches
+                future.set_result(data)
+                return future
+            future = self._pool.submit(self._decode, file_path)
+            self._pending[file_path] = future
+            return future
+
+    def _decode(self, file_path):
+        try:
+            with profiling.span("player.decode", path=file_path):
+                data = decode_pcm(file_path, self.frequency, self.sample_width, self.channels)
+            self.cache.put(file_path, data)
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(file_path, None)
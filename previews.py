@@ -0,0 +1,113 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PREVIEW_SECONDS = 30  # Length of a hook clip
+ANALYSIS_RATE = 11025  # Energy analysis does not need full bandwidth
+FRAME_SECONDS = 0.1  # Resolution of the energy curve
+
+
+def preview_path(file_path):
+    """Where the preview clip of a song is cached: next to the song."""
+    return os.path.splitext(file_path)[0] + ".preview.mp3"
+
+
+def is_fresh(file_path):
+    """True if the song has a preview at least as new as the song itself."""
+    try:
+        return os.path.getmtime(preview_path(file_path)) >= os.path.getmtime(file_path)
+    except OSError:
+        return False
+
+
+def find_hook(samples, rate, window_seconds, frame_seconds=FRAME_SECONDS):
+    """Start (in seconds) of the ``window_seconds`` window with the most energy.
+
+    ``samples`` is a mono signal. Energy is summed per frame, then every
+    window sum is read off one cumulative sum, so the scan is O(n).
+    """
+    frame = max(1, int(rate * frame_seconds))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return 0.0
+    signal = np.asarray(samples[:n_frames * frame], dtype=np.float64)
+    energy = np.square(signal).reshape(n_frames, frame).sum(axis=1)
+
+    window = max(1, min(n_frames, int(round(window_seconds / frame_seconds))))
+    totals = np.concatenate(([0.0], np.cumsum(energy)))
+    window_energy = totals[window:] - totals[:-window]
+    return int(np.argmax(window_energy)) * frame / rate
+
+
+def build_preview(file_path, clip_seconds=PREVIEW_SECONDS):
+    """Process-pool worker: cut the loudest ``clip_seconds`` of a song to its preview file."""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(file_path)
+    analysis = audio.set_channels(1).set_frame_rate(ANALYSIS_RATE)
+    start = find_hook(np.array(analysis.get_array_of_samples()), ANALYSIS_RATE, clip_seconds)
+
+    start_ms = int(start * 1000)
+    clip = audio[start_ms:start_ms + clip_seconds * 1000].fade_in(200).fade_out(500)
+
+    target = preview_path(file_path)
+    tmp_path = target + ".tmp"
+    clip.export(tmp_path, format="mp3")
+    os.replace(tmp_path, target)  # Never leave a truncated preview behind
+    return target
+
+
+class PreviewBuilder:
+    """Build missing or outdated preview clips on a process pool.
+
+    Songs whose preview failed are remembered in ``failed`` and skipped
+    until the song file changes, so a broken file is not retried on every
+    ``submit``.
+    """
+
+    def __init__(self, max_workers=None, clip_seconds=PREVIEW_SECONDS):
+        self.clip_seconds = clip_seconds
+        self._processes = ProcessPoolExecutor(max_workers=max_workers)
+        self._pending = {}  # file_path -> future
+        self.failed = {}  # file_path -> (song mtime, error message)
+
+    def submit(self, file_paths):
+        """Queue every stale song once; returns the futures of the new work."""
+        futures = []
+        for file_path in file_paths:
+            if file_path in self._pending or is_fresh(file_path) or self._failed_before(file_path):
+                continue
+            future = self._processes.submit(build_preview, file_path, self.clip_seconds)
+            future.add_done_callback(lambda done, file_path=file_path: self._finish(file_path, done))
+            self._pending[file_path] = future
+            futures.append(future)
+        return futures
+
+    def shutdown(self):
+        self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _failed_before(self, file_path):
+        failure = self.failed.get(file_path)
+        if failure is None:
+            return False
+        try:
+            return os.path.getmtime(file_path) == failure[0]
+        except OSError:
+            return True  # Still missing
+
+    def _finish(self, file_path, future):
+        self._pending.pop(file_path, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.failed.pop(file_path, None)
+            return
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            mtime = None
+        self.failed[file_path] = (mtime, str(error))
+        print(f"Could not build the preview of {file_path}: {error}", file=sys.stderr)
@@ -0,0 +1,157 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Set MUSIC_TOURNAMENT_PROFILE=1 to record from startup
+enabled = os.environ.get("MUSIC_TOURNAMENT_PROFILE", "") not in ("", "0")
+
+_events = deque(maxlen=500_000)  # Chrome trace events, oldest dropped first
+_stats = {}  # name -> [count, total seconds, max seconds]
+_counters = {}  # name -> value
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+
+class _NullSpan:
+    """What ``span`` returns while profiling is off: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _record(self.name, self.start, end - self.start, self.args)
+        return False
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Forget every recorded span and counter."""
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+
+
+def span(name, **args):
+    """Context manager timing a block as ``name``; free when profiling is off."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def add_span(name, start, duration, **args):
+    """Record a span timed elsewhere, e.g. in a worker process.
+
+    ``start`` is a ``time.perf_counter()`` value of this process; the span
+    shows up on the calling thread.
+    """
+    if enabled:
+        _record(name, start, duration, args)
+
+
+def instrument(name=None):
+    """Decorator timing every call of a function as one span."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(span_name, start, time.perf_counter() - start, None)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add ``value`` to a counter (also shown in the trace as a counter track)."""
+    if not enabled:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+        _events.append({
+            "name": name, "ph": "C", "ts": (time.perf_counter() - _origin) * 1e6,
+            "pid": os.getpid(), "args": {name: total},
+        })
+
+
+def _record(name, start, duration, args):
+    event = {
+        "name": name, "ph": "X", "ts": (start - _origin) * 1e6, "dur": duration * 1e6,
+        "pid": os.getpid(), "tid": threading.get_ident(),
+    }
+    if args:
+        event["args"] = args
+    with _lock:
+        _events.append(event)
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, duration, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+            if duration > entry[2]:
+                entry[2] = duration
+
+
+def stats():
+    """``{name: {"count", "total", "mean", "max"}}`` for spans, plus ``counters``."""
+    with _lock:
+        spans = {
+            name: {"count": calls, "total": total, "mean": total / calls, "max": longest}
+            for name, (calls, total, longest) in _stats.items()
+        }
+        return {"spans": spans, "counters": dict(_counters)}
+
+
+def export_trace(path):
+    """Write the recorded events as a Chrome trace (chrome://tracing, Perfetto)."""
+    with _lock:
+        events = list(_events)
+    thread_names = [
+        {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread.ident, "args": {"name": thread.name}}
+        for thread in threading.enumerate()
+    ]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": thread_names + events, "displayTimeUnit": "ms"}, f)
+    os.replace(tmp_path, path)
+    return len(events)
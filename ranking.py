@@ -0,0 +1,123 @@
+import json
+import math
+import os
+
+from match import Match
+
+
+def theoretical_minimum(n):
+    """Fewest comparisons that can sort ``n`` items in the worst case: ceil(log2(n!))."""
+    if n < 2:
+        return 0
+    return math.ceil(math.lgamma(n + 1) / math.log(2) - 1e-9)
+
+
+def binary_insertion_bound(n):
+    """Worst-case comparisons of binary insertion: sum of ceil(log2(k)) for k = 1..n."""
+    return sum((k - 1).bit_length() for k in range(1, n + 1))
+
+
+def _binary_insertion(items):
+    """Generator form of binary insertion sort, best item first.
+
+    Yields ``(challenger, ranked_item)`` pairs and expects to be sent True
+    when the challenger wins. Each insertion needs at most ceil(log2(k + 1))
+    votes, which stays within a few percent of ``theoretical_minimum``.
+    """
+    ranked = []
+    for item in items:
+        lo, hi = 0, len(ranked)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (yield item, ranked[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        ranked.insert(lo, item)
+    return ranked
+
+
+class RankingSession:
+    """Full ranking of a library through as few head-to-head votes as possible.
+
+    Pending comparisons come out one at a time as ``Match`` objects
+    (``next_match``); ``record`` feeds the winner back. The session is fully
+    determined by the competitor order and the list of answers so far, so
+    ``save``/``load`` can stop and resume it at any vote.
+    """
+
+    def __init__(self, competitors, answers=()):
+        self.competitors = list(competitors)
+        self.answers = []
+        self.result = None
+        self._sorter = _binary_insertion(self.competitors)
+        self._pending = None
+        self._advance(None)
+        for answer in answers:
+            self._answer(answer)
+
+    @property
+    def votes_used(self):
+        return len(self.answers)
+
+    def is_done(self):
+        return self.result is not None
+
+    def next_match(self):
+        """The comparison to vote on next, or None once the ranking is complete."""
+        if self._pending is None:
+            return None
+        return Match(*self._pending)
+
+    def record(self, winner):
+        """Record the winner of the match returned by ``next_match``."""
+        if self._pending is None or winner not in self._pending:
+            raise ValueError("Winner must be one of the competitors")
+        self._answer(winner is self._pending[0])
+
+    def ranking(self):
+        """Competitors best first, or None while votes are still pending."""
+        return self.result
+
+    def report(self):
+        """Votes used against the information-theoretic minimum for this library."""
+        n = len(self.competitors)
+        return {
+            "songs": n,
+            "votes_used": self.votes_used,
+            "theoretical_minimum": theoretical_minimum(n),
+            "worst_case": binary_insertion_bound(n),
+        }
+
+    def save(self, path):
+        data = {
+            "order": [competitor.song_id for competitor in self.competitors],
+            "answers": "".join("1" if answer else "0" for answer in self.answers),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, registry):
+        """Resume a saved session, or return None if its songs are not all in ``registry``."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not all(song_id in registry for song_id in data["order"]):
+            return None
+        competitors = [registry.get(song_id) for song_id in data["order"]]
+        return cls(competitors, [answer == "1" for answer in data["answers"]])
+
+    def _answer(self, challenger_won):
+        if self._pending is None:
+            raise ValueError("The ranking is already complete")
+        self.answers.append(challenger_won)
+        self._advance(challenger_won)
+
+    def _advance(self, value):
+        try:
+            self._pending = self._sorter.send(value)
+        except StopIteration as done:
+            self._pending = None
+            self.result = done.value
@@ -0,0 +1,221 @@
+import sqlite3
+import time
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    winner TEXT NOT NULL,
+    loser TEXT NOT NULL,
+    played REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    winner TEXT NOT NULL,
+    loser TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (winner, loser)
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    song_id TEXT PRIMARY KEY,
+    rating REAL NOT NULL
+);
+"""
+
+
+def song_key(competitor):
+    """Key a competitor's results are stored under: its song ID, or its name."""
+    return competitor.song_id or competitor.name
+
+
+class RatingStore:
+    """Bradley-Terry strengths fitted from every match ever decided.
+
+    Each result is kept in the ``matches`` table and folded into ``pairs``,
+    which holds one row per (winner, loser) with a count, so the fit works
+    on distinct pairings rather than on the raw history. Ratings are natural
+    log-strengths: a difference of 1 means about a 73% chance to win.
+    ``prior`` adds that many virtual wins and losses against an average
+    song (rating 0), which anchors the scale and keeps unbeaten songs
+    finite.
+
+    ``update`` is cheap enough for the UI thread: it only re-fits the songs
+    in results recorded since the last call, with a few MM (minorise-
+    maximise) sweeps over the pairings that involve them, and only writes
+    their ratings. ``refit`` runs the full fit over every pairing.
+    """
+
+    def __init__(self, path="ratings.db", prior=1.0):
+        self.path = path
+        self.prior = prior
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._index = {}  # Song key -> position in the arrays below
+        self._keys = []
+        self._log_strength = np.zeros(0)
+        # Pairings, with room to grow: only the first _size entries are used
+        self._winners = np.zeros(0, dtype=np.int64)
+        self._losers = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0)
+        self._size = 0
+        self._pending = []  # (winner, loser) positions recorded since the last update
+        self._load()
+
+    def _load(self):
+        rows = self.db.execute("SELECT song_id, rating FROM ratings").fetchall()
+        for song_id, _ in rows:
+            self._position(song_id)
+        self._log_strength = np.array([rating for _, rating in rows], dtype=np.float64)
+        rows = self.db.execute("SELECT winner, loser, count FROM pairs").fetchall()
+        if rows:
+            winners, losers, counts = zip(*rows)
+            self._append([self._position(key) for key in winners], [self._position(key) for key in losers], counts)
+
+    def _position(self, key):
+        position = self._index.get(key)
+        if position is None:
+            position = self._index[key] = len(self._keys)
+            self._keys.append(key)
+        return position
+
+    def _append(self, winners, losers, counts):
+        """Add pairings, doubling the arrays when they are full."""
+        end = self._size + len(winners)
+        if end > len(self._counts):
+            capacity = max(end, 2 * len(self._counts), 1024)
+            for name in ("_winners", "_losers", "_counts"):
+                old = getattr(self, name)
+                grown = np.zeros(capacity, dtype=old.dtype)
+                grown[:self._size] = old[:self._size]
+                setattr(self, name, grown)
+        self._winners[self._size:end] = winners
+        self._losers[self._size:end] = losers
+        self._counts[self._size:end] = counts
+        self._size = end
+
+    def _grow_strengths(self):
+        """Songs new since the last fit start at the average strength."""
+        n = len(self._keys)
+        if len(self._log_strength) < n:
+            log_strength = np.zeros(n)
+            log_strength[:len(self._log_strength)] = self._log_strength
+            self._log_strength = log_strength
+
+    def record(self, winner, loser):
+        """Store one decided match between two competitors."""
+        self.record_many([(winner, loser)])
+
+    def record_many(self, results):
+        """Store ``(winner, loser)`` competitor pairs in one transaction."""
+        rows = [(song_key(winner), song_key(loser)) for winner, loser in results]
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO matches (winner, loser, played) VALUES (?, ?, ?)",
+                [(winner, loser, now) for winner, loser in rows],
+            )
+            self.db.executemany(
+                "INSERT INTO pairs (winner, loser, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (winner, loser) DO UPDATE SET count = count + 1",
+                rows,
+            )
+        self._pending.extend((self._position(winner), self._position(loser)) for winner, loser in rows)
+
+    def update(self, sweeps=5):
+        """Fold the results recorded since the last call into the ratings.
+
+        Only the songs in those results move; every other rating stays
+        fixed. Returns the number of songs re-fitted.
+        """
+        if not self._pending:
+            return 0
+        winners, losers = self._take_pending()
+
+        n = len(self._keys)
+        songs = np.unique(np.concatenate([winners, losers]))
+        local = np.full(n, -1, dtype=np.int64)  # Song position -> index in ``songs``
+        local[songs] = np.arange(len(songs))
+        all_winners, all_losers = self._winners[:self._size], self._losers[:self._size]
+        rows = np.flatnonzero((local[all_winners] >= 0) | (local[all_losers] >= 0))
+        winner_pos, loser_pos, counts = all_winners[rows], all_losers[rows], self._counts[rows]
+        winner_local, loser_local = local[winner_pos], local[loser_pos]
+        as_winner, as_loser = winner_local >= 0, loser_local >= 0
+
+        log_strength = self._log_strength
+        wins = np.bincount(winner_local[as_winner], weights=counts[as_winner], minlength=len(songs)) + self.prior
+        for _ in range(sweeps):
+            strength = np.exp(log_strength[songs])
+            per_game = counts / (np.exp(log_strength[winner_pos]) + np.exp(log_strength[loser_pos]))
+            games = (
+                np.bincount(winner_local[as_winner], weights=per_game[as_winner], minlength=len(songs))
+                + np.bincount(loser_local[as_loser], weights=per_game[as_loser], minlength=len(songs))
+                + 2 * self.prior / (strength + 1.0)
+            )
+            log_strength[songs] = np.log(wins / games)
+        self._save(songs)
+        return len(songs)
+
+    def refit(self, max_sweeps=200, tolerance=1e-6):
+        """Fit every rating from all pairings and save them; returns the sweeps used."""
+        if self._pending:
+            self._take_pending()
+        self._grow_strengths()
+        n = len(self._keys)
+        if not n or not self._size:
+            return 0
+        winners, losers, counts = self._winners[:self._size], self._losers[:self._size], self._counts[:self._size]
+        log_strength = self._log_strength
+        wins = np.bincount(winners, weights=counts, minlength=n) + self.prior
+        sweeps = 0
+        for sweeps in range(1, max_sweeps + 1):
+            strength = np.exp(log_strength)
+            per_game = counts / (strength[winners] + strength[losers])
+            games = (
+                np.bincount(winners, weights=per_game, minlength=n)
+                + np.bincount(losers, weights=per_game, minlength=n)
+                + 2 * self.prior / (strength + 1.0)
+            )
+            updated = np.log(wins / games)
+            updated -= updated.mean()
+            change = np.abs(updated - log_strength).max()
+            log_strength = updated
+            if change < tolerance:
+                break
+        self._log_strength = log_strength
+        self._save(np.arange(n))
+        return sweeps
+
+    def _take_pending(self):
+        """Move pending results into the pairing arrays; returns their positions."""
+        winners, losers = zip(*self._pending)
+        self._pending = []
+        # Repeated pairings are appended as separate entries, which the sums
+        # treat exactly like one merged count
+        self._append(winners, losers, np.ones(len(winners)))
+        self._grow_strengths()
+        return winners, losers
+
+    def _save(self, positions):
+        """Write the ratings of the songs at ``positions``."""
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO ratings (song_id, rating) VALUES (?, ?) "
+                "ON CONFLICT (song_id) DO UPDATE SET rating = excluded.rating",
+                ((self._keys[position], float(self._log_strength[position])) for position in positions.tolist()),
+            )
+
+    def rating(self, competitor):
+        position = self._index.get(song_key(competitor))
+        if position is None or position >= len(self._log_strength):
+            return 0.0
+        return float(self._log_strength[position])
+
+    def ratings(self):
+        """``{song key: rating}`` for every song with a result."""
+        return dict(zip(self._keys, self._log_strength.tolist()))  # Unfitted songs are left out
+
+    def match_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+from competitor import Competitor
+
+
+class SongRegistry:
+    """All songs known to the app, keyed by a stable song ID."""
+
+    def __init__(self):
+        self._songs = {}  # song_id -> Competitor, in insertion order
+
+    @staticmethod
+    def make_id(file_path):
+        """Derive a stable ID from a file's absolute path."""
+        path = os.path.normcase(os.path.abspath(file_path))
+        return hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+
+    def add(self, name, file_path, song_id=None, metadata=None):
+        """Register a song and return its Competitor.
+
+        ``song_id`` defaults to a hash of the file path; pass a source key
+        (e.g. ``"yt:<video id>"``) for songs that come from elsewhere. Adding
+        an ID that is already registered returns the existing entry.
+        """
+        if song_id is None:
+            song_id = self.make_id(file_path)
+        existing = self._songs.get(song_id)
+        if existing is not None:
+            return existing
+        competitor = Competitor(name, file_path, song_id, metadata)
+        self._songs[song_id] = competitor
+        return competitor
+
+    def register(self, competitor):
+        """Register an existing Competitor (e.g. one restored from a saved tournament)."""
+        return self._songs.setdefault(competitor.song_id, competitor)
+
+    def get(self, song_id):
+        return self._songs[song_id]
+
+    def remove(self, song_id):
+        return self._songs.pop(song_id)
+
+    def competitors(self):
+        """All registered songs, in the order they were added."""
+        return list(self._songs.values())
+
+    def __contains__(self, song_id):
+        return song_id in self._songs
+
+    def __len__(self):
+        return len(self._songs)
+
+    def __iter__(self):
+        return iter(self._songs.values())
@@ -0,0 +1,235 @@
+import math
+
+import profiling
+
+
+class BracketRenderer:
+    """Retained-mode bracket drawing on a Tk canvas.
+
+    Every match owns a group of canvas items tagged ``m<node>``. Items are
+    only created for matches inside the visible part of the scroll region,
+    and a refresh only touches the labels whose text actually changed.
+    Redraw requests are coalesced into a single idle-time update. With a
+    ``waveforms`` store (see waveform.WaveformStore), each song's box also
+    shows its waveform thumbnail, read when the box is first drawn.
+    """
+
+    # Constants for drawing
+    round_spacing = 200  # Space between rounds
+    match_spacing = 80   # Space between first-round matches
+    box_width = 150      # Width of each match box
+    box_height = 30      # Height of each match box
+    box_gap = 10         # Gap between the two boxes of a match
+    start_x = 50         # Starting x-coordinate for the first round
+    start_y = 50         # Starting y-coordinate
+    margin = 100         # Extra space around the bracket in the scroll region
+    wave_width = 40      # Width of the waveform thumbnail at the right of a box
+
+    def __init__(self, canvas, waveforms=None):
+        self.canvas = canvas
+        self.waveforms = waveforms
+        self.bracket = None
+        self._drawn = {}  # node -> label state the items were drawn with
+        self._pending = None  # after_idle id of the scheduled refresh
+        self._scrollregion = None
+        self.canvas.bind("<Configure>", lambda event: self.schedule())
+
+    def set_bracket(self, bracket):
+        """Start drawing a new bracket (or nothing, for None)."""
+        self.bracket = bracket
+        self.canvas.delete("match")
+        self._drawn.clear()
+        self.schedule()
+
+    def scroll_command(self, scrollbar):
+        """Wrap a scrollbar's ``set`` so scrolling also draws newly exposed matches."""
+        def command(*args):
+            scrollbar.set(*args)
+            self.schedule()
+        return command
+
+    def schedule(self):
+        """Request a refresh; several requests before the next idle run only one."""
+        if self._pending is None:
+            self._pending = self.canvas.after_idle(self._flush)
+
+    def _flush(self):
+        self._pending = None
+        self.refresh()
+
+    # Geometry
+
+    def match_height(self):
+        return 2 * self.box_height + self.box_gap
+
+    def match_boxes(self, node):
+        """x, top y of the upper box and top y of the lower box of a match."""
+        round_idx = self.bracket.tree.round_of(node)
+        lo, _ = self.bracket.tree.round_range(round_idx)
+        x, y = self.match_origin(round_idx, node - lo)
+        return x, y, y + self.box_height + self.box_gap
+
+    def match_origin(self, round_idx, idx):
+        """Top-left corner of match ``idx`` of ``round_idx``, centred on its feeders."""
+        span = 1 << round_idx
+        x = self.start_x + round_idx * self.round_spacing
+        y = self.start_y + (idx * span + (span - 1) / 2) * self.match_spacing
+        return x, y
+
+    def visible_nodes(self, rounds_drawn):
+        """Yield the match nodes that intersect the visible canvas area."""
+        tree = self.bracket.tree
+        x0 = self.canvas.canvasx(0)
+        y0 = self.canvas.canvasy(0)
+        x1 = x0 + self.canvas.winfo_width()
+        y1 = y0 + self.canvas.winfo_height()
+
+        # The winner label and connectors reach one round spacing to the right
+        first_round = max(0, math.floor((x0 - self.start_x) / self.round_spacing) - 1)
+        last_round = min(rounds_drawn - 1, math.floor((x1 - self.start_x) / self.round_spacing))
+        for round_idx in range(first_round, last_round + 1):
+            lo, hi = tree.round_range(round_idx)
+            span = 1 << round_idx
+            offset = (span - 1) / 2
+            top = (y0 - self.match_height() - self.start_y) / self.match_spacing
+            bottom = (y1 - self.start_y) / self.match_spacing
+            first = max(0, math.ceil((top - offset) / span))
+            last = min(hi - lo - 1, math.floor((bottom - offset) / span))
+            for node in range(lo + first, lo + last + 1):
+                yield node
+
+    # Drawing
+
+    @profiling.instrument("renderer.refresh")
+    def refresh(self):
+        """Bring the canvas in line with the bracket, touching only what changed."""
+        if self.bracket is None:
+            self.canvas.delete("match")
+            self._drawn.clear()
+            return
+
+        tree = self.bracket.tree
+        rounds_drawn = len(self.bracket.rounds)
+        max_x = self.start_x + self.round_spacing * rounds_drawn
+        max_y = self.start_y + self.match_spacing * (tree.size >> 1)
+        scrollregion = (0, 0, max_x + self.margin, max_y + self.margin)
+        if scrollregion != self._scrollregion:
+            self._scrollregion = scrollregion
+            self.canvas.config(scrollregion=scrollregion)
+
+        visible = set()
+        created = updated = 0
+        for node in self.visible_nodes(rounds_drawn):
+            if tree.is_bye(node):
+                continue  # A bye is not a match, its entrant shows up next round
+            visible.add(node)
+            state = self.match_state(node, rounds_drawn)
+            drawn = self._drawn.get(node)
+            if drawn is None:
+                self.create_match(node, state)
+                created += 1
+            elif drawn != state:
+                self.update_match(node, drawn, state)
+                updated += 1
+
+        # Drop the items of matches that scrolled out of view
+        hidden = [node for node in self._drawn if node not in visible]
+        for node in hidden:
+            self.canvas.delete(f"m{node}")
+            del self._drawn[node]
+        profiling.count("renderer.matches_created", created)
+        profiling.count("renderer.matches_updated", updated)
+        profiling.count("renderer.matches_deleted", len(hidden))
+
+    def match_state(self, node, rounds_drawn):
+        """Everything a match's items depend on: both names, winner, last round, waveforms."""
+        tree = self.bracket.tree
+        a = self.bracket.competitor_at(2 * node)
+        b = self.bracket.competitor_at(2 * node + 1)
+        winner = self.bracket.competitor_at(node)
+        is_last = tree.round_of(node) + 1 == rounds_drawn
+        return (
+            a.name if a else "TBD",
+            b.name if b else "TBD",
+            winner.name if winner else "TBD",
+            is_last,
+            self.waveform_key(a),
+            self.waveform_key(b),
+        )
+
+    def waveform_key(self, competitor):
+        """Song ID whose thumbnail a box shows, or None."""
+        if self.waveforms is None or competitor is None or competitor.song_id is None:
+            return None
+        return competitor.song_id if competitor.song_id in self.waveforms else None
+
+    def create_match(self, node, state):
+        tree = self.bracket.tree
+        name_a, name_b, winner_name, is_last, wave_a, wave_b = state
+        round_idx = tree.round_of(node)
+        x, y, lower_y = self.match_boxes(node)
+        tag = f"m{node}"
+        box_width, box_height = self.box_width, self.box_height
+        text_width = box_width - self.wave_width - 10  # Names wrap before the waveform thumbnail
+
+        # Draw boxes for the competitors
+        self.canvas.create_rectangle(x, y, x + box_width, y + box_height, outline="black", fill="lightblue", tags=("match", tag))
+        self.canvas.create_text(x + 5, y + box_height // 2, text=name_a, anchor="w", width=text_width, tags=("match", tag, tag + "a"))
+
+        self.canvas.create_rectangle(x, lower_y, x + box_width, lower_y + box_height, outline="black", fill="lightcoral", tags=("match", tag))
+        self.canvas.create_text(x + 5, lower_y + box_height // 2, text=name_b, anchor="w", width=text_width, tags=("match", tag, tag + "b"))
+        self.draw_waveform(x, y, wave_a, (tag, tag + "va"))
+        self.draw_waveform(x, lower_y, wave_b, (tag, tag + "vb"))
+
+        if is_last:
+            # Draw winner information
+            self.canvas.create_text(x + box_width + 20, y + box_height // 2 + 10, text=f"Winner: {winner_name}", anchor="w", fill="gold", tags=("match", tag, tag + "w"))
+        elif node > 1:
+            # Draw connecting lines to the next round's match
+            parent = tree.next_match(node)
+            parent_round = round_idx + 1
+            parent_lo, _ = tree.round_range(parent_round)
+            next_x, next_y = self.match_origin(parent_round, parent - parent_lo)
+            next_y += box_height + self.box_gap // 2  # Middle of the next match
+            self.canvas.create_line(x + box_width, y + box_height // 2, next_x, next_y, fill="black", tags=("match", tag))
+            self.canvas.create_line(x + box_width, lower_y + box_height // 2, next_x, next_y, fill="black", tags=("match", tag))
+
+        self._drawn[node] = state
+
+    def update_match(self, node, drawn, state):
+        tag = f"m{node}"
+        if drawn[3] != state[3]:
+            # The match stopped (or started) being the last round: rebuild it
+            self.canvas.delete(tag)
+            self.create_match(node, state)
+            return
+        if drawn[0] != state[0]:
+            self.canvas.itemconfigure(tag + "a", text=state[0])
+        if drawn[1] != state[1]:
+            self.canvas.itemconfigure(tag + "b", text=state[1])
+        if drawn[2] != state[2] and state[3]:
+            self.canvas.itemconfigure(tag + "w", text=f"Winner: {state[2]}")
+        if drawn[4:] != state[4:]:
+            x, y, lower_y = self.match_boxes(node)
+            for side, box_y, old, new in (("a", y, drawn[4], state[4]), ("b", lower_y, drawn[5], state[5])):
+                if old != new:
+                    self.canvas.delete(tag + "v" + side)
+                    self.draw_waveform(x, box_y, new, (tag, tag + "v" + side))
+        self._drawn[node] = state
+
+    def draw_waveform(self, x, y, song_id, tags):
+        """Draw a song's min/max peaks as one filled shape at the right of its box."""
+        if song_id is None:
+            return
+        peaks = self.waveforms.get(song_id)
+        if peaks is None:
+            return
+        peaks = peaks.tolist()
+        left = x + self.box_width - self.wave_width - 4
+        middle = y + self.box_height / 2
+        scale = (self.box_height / 2 - 4) / 127
+        step = self.wave_width / max(len(peaks) - 1, 1)
+        top = [(left + idx * step, middle - high * scale) for idx, (_, high) in enumerate(peaks)]
+        bottom = [(left + idx * step, middle - low * scale) for idx, (low, _) in enumerate(peaks)]
+        points = [coord for point in top + bottom[::-1] for coord in point]
+        self.canvas.create_polygon(points, fill="gray25", outline="", tags=("match",) + tags)
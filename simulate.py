@@ -0,0 +1,149 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+class SimulationResult:
+    """Outcome of ``simulate_bracket``.
+
+    ``reach[i, r]`` is the estimated probability that entrant ``i`` plays
+    in round ``r``; the last column is the probability of winning it all.
+    """
+
+    def __init__(self, competitors, counts, simulations, converged):
+        self.competitors = competitors
+        self.simulations = simulations
+        self.converged = converged
+        self.reach = counts / max(simulations, 1)
+
+    def win_probabilities(self):
+        return self.reach[:, -1]
+
+    def standard_error(self):
+        """Largest standard error of any title probability."""
+        p = self.win_probabilities()
+        return float(np.sqrt(p * (1 - p) / max(self.simulations, 1)).max())
+
+    def table(self):
+        """``(competitor, [probability of reaching each round])``, most likely winner first."""
+        order = np.argsort(-self.win_probabilities(), kind="stable")
+        return [(self.competitors[i], self.reach[i].tolist()) for i in order]
+
+
+def bracket_arrays(bracket):
+    """The parts of a bracket the simulation needs, as plain arrays.
+
+    Returns the round-0 slot array and, for every round, the winners that
+    are already fixed (decided matches and byes) or -1.
+    """
+    tree = bracket.tree
+    slots = np.array(tree.slots, dtype=np.int32)
+    leaves = slots[tree.size:]
+    fixed = [slots[slice(*tree.round_range(round_idx))] for round_idx in range(tree.depth)]
+    return leaves, fixed
+
+
+def simulate_chunk(leaves, fixed, ratings, simulations, batch_size, seed):
+    """Simulate ``simulations`` brackets and count how far each entrant got.
+
+    Every batch plays all its brackets at once: each round pairs up the
+    columns of a (batch, slots) array and draws all match results with one
+    vectorised comparison against Bradley-Terry win probabilities.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(ratings)
+    depth = len(fixed)
+    ratings = np.asarray(ratings, dtype=np.float64)
+    # Bradley-Terry weights: P(a beats b) = w_a / (w_a + w_b), no exp per match
+    weights = np.maximum(np.exp(ratings - ratings.max()), 1e-300)
+    counts = np.zeros((n, depth + 1), dtype=np.int64)
+    present = leaves[leaves >= 0]
+
+    # The first round's pairings are the same in every bracket
+    a0, b0 = leaves[0::2], leaves[1::2]
+    real = (a0 >= 0) & (b0 >= 0)
+    p0 = np.zeros(len(a0))
+    p0[real] = weights[a0[real]] / (weights[a0[real]] + weights[b0[real]])
+
+    done = 0
+    while done < simulations:
+        batch = min(batch_size, simulations - done)
+        counts[present, 0] += batch
+        current = None
+        for round_idx in range(depth):
+            u = rng.random((batch, len(fixed[round_idx])))
+            if current is None:
+                sampled = np.where(u < p0, a0, b0)
+            else:
+                a = current[:, 0::2]
+                b = current[:, 1::2]
+                wa = weights[a]
+                sampled = np.where(u * (wa + weights[b]) < wa, a, b)
+            decided = fixed[round_idx]
+            current = np.where(decided >= 0, decided, sampled)  # Byes and decided matches
+            counts[:, round_idx + 1] += np.bincount(current.ravel(), minlength=n)
+        done += batch
+    return counts
+
+
+def resolve_ratings(bracket, ratings):
+    """Ratings per entrant index from a sequence or a ``{song_id: rating}`` dict."""
+    if isinstance(ratings, dict):
+        return [ratings.get(bracket.competitor(idx).song_id, 0.0) for idx in range(len(bracket.competitors))]
+    if len(ratings) != len(bracket.competitors):
+        raise ValueError("Need one rating per competitor")
+    return list(ratings)
+
+
+def simulate_bracket(bracket, ratings, simulations=1_000_000, batch_size=20_000,
+                     tolerance=1e-3, seed=None, workers=None, check_every=None):
+    """Estimate every entrant's chance of reaching each round by Monte Carlo.
+
+    ``ratings`` are Bradley-Terry log-strengths (a difference of 1 means
+    about a 73% chance to win), per entrant or as ``{song_id: rating}``.
+    Matches already decided in ``bracket`` keep their result. Simulation
+    runs in steps of ``check_every`` brackets and stops early once the
+    largest standard error of the title odds is below ``tolerance``.
+    With ``workers > 1`` each step is split over a process pool; by default
+    a pool with one worker per CPU is used for runs of 10^8 matches or more.
+    """
+    ratings = resolve_ratings(bracket, ratings)
+    leaves, fixed = bracket_arrays(bracket)
+    n = len(ratings)
+    depth = len(fixed)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if simulations * len(leaves) >= 10 ** 8 else 1
+    check_every = check_every or batch_size * workers * 5
+    seeds = np.random.SeedSequence(seed)
+
+    counts = np.zeros((n, depth + 1), dtype=np.int64)
+    done = 0
+    converged = False
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while done < simulations and not converged:
+            step = min(check_every, simulations - done)
+            shares = [step // workers + (1 if i < step % workers else 0) for i in range(workers)]
+            shares = [share for share in shares if share]
+            children = seeds.spawn(len(shares))
+            if pool is None:
+                counts += simulate_chunk(leaves, fixed, ratings, step, batch_size, children[0])
+            else:
+                futures = [
+                    pool.submit(simulate_chunk, leaves, fixed, ratings, share, batch_size, child)
+                    for share, child in zip(shares, children)
+                ]
+                for future in futures:
+                    counts += future.result()
+            done += step
+
+            p = counts[:, -1] / done
+            converged = math.sqrt(float((p * (1 - p)).max()) / done) < tolerance
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    competitors = [bracket.competitor(idx) for idx in range(n)]
+    return SimulationResult(competitors, counts, done, converged)
@@ -0,0 +1,17 @@
+import profiling
+from audio_cache import TRANSCODE_SETTINGS
+
+
+@profiling.instrument("transcode.reencode_mp3")
+def reencode_mp3(file_path, output_path=None):
+    """Decode a downloaded file and write it out as a proper MP3.
+
+    Writes to ``output_path`` when given, otherwise replaces the file in place.
+    """
+    from pydub import AudioSegment
+
+    output_path = output_path or file_path
+    audio = AudioSegment.from_file(file_path)
+    audio.export(output_path, format=TRANSCODE_SETTINGS["format"])
+    return output_path
+
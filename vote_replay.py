@@ -0,0 +1,159 @@
+import csv
+import itertools
+import json
+import random
+
+import numpy as np
+
+from bracket_tree import EMPTY
+
+COLUMNS = ("voter", "matchup", "choice")
+
+
+def matchup_key(key_a, key_b):
+    """Order-independent key of a matchup between two entrant keys."""
+    return (key_a, key_b) if key_a <= key_b else (key_b, key_a)
+
+
+def read_vote_rows(path):
+    """Yield ``(voter, matchup, choice)`` rows from a CSV or JSON Lines log.
+
+    ``matchup`` is ``"<key a>|<key b>"`` in either order and ``choice`` is the
+    key of the song voted for, where a key is the song ID or the song name
+    (``resolve_bracket`` accepts either). CSV files may start with a
+    ``voter,matchup,choice`` header; JSON Lines files hold one object with
+    those fields per line.
+    """
+    if path.endswith((".jsonl", ".ndjson", ".json")):
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.read(1)
+            f.seek(0)
+            if first == "[":
+                # A plain JSON array cannot be streamed; it is loaded whole
+                for row in json.load(f):
+                    yield row["voter"], row["matchup"], row["choice"]
+                return
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row["voter"], row["matchup"], row["choice"]
+        return
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return
+        if [column.strip().lower() for column in first] == list(COLUMNS):
+            first = None
+        rows = reader if first is None else itertools.chain([first], reader)
+        for row in rows:
+            if row:
+                yield row[0], row[1], row[2]
+
+
+def count_votes(rows, chunk_size=500_000):
+    """Count votes per ``(matchup_key, choice)``, one chunk of rows at a time.
+
+    Each chunk is factorised with ``np.unique`` and counted in a single
+    vectorised pass, so only one chunk of raw rows is in memory at once.
+    Within a chunk only the first vote of each voter on a matchup counts;
+    repeats that fall into different chunks are not detected, so a log
+    from an untrusted source should be deduplicated beforehand.
+    """
+    totals = {}
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        voters, matchups, choices = zip(*chunk)
+        unique_matchups, matchup_idx = np.unique(np.array(matchups), return_inverse=True)
+        unique_choices, choice_idx = np.unique(np.array(choices), return_inverse=True)
+
+        # "a|b" and "b|a" are the same matchup
+        canonical = {}
+        ids = []
+        for matchup in unique_matchups.tolist():
+            key_a, separator, key_b = str(matchup).partition("|")
+            if not separator:
+                raise ValueError(f"Matchup {matchup!r} is not of the form '<song a>|<song b>'")
+            ids.append(canonical.setdefault(matchup_key(key_a, key_b), len(canonical)))
+        keys = list(canonical)
+        matchup_idx = np.array(ids, dtype=np.int64)[matchup_idx]
+
+        # Keep the first vote of every (voter, matchup)
+        _, voter_idx = np.unique(np.array(voters), return_inverse=True)
+        _, first = np.unique(voter_idx.astype(np.int64) * len(keys) + matchup_idx, return_index=True)
+        if len(first) < len(chunk):
+            first.sort()
+            matchup_idx, choice_idx = matchup_idx[first], choice_idx[first]
+
+        pairs = matchup_idx * len(unique_choices) + choice_idx
+        space = len(keys) * len(unique_choices)
+        if space <= 4 * len(pairs):
+            counts = np.bincount(pairs, minlength=space)
+            unique_pairs = np.flatnonzero(counts)
+            counts = counts[unique_pairs]
+        else:
+            unique_pairs, counts = np.unique(pairs, return_counts=True)
+
+        for pair, count in zip(unique_pairs.tolist(), counts.tolist()):
+            key = (keys[pair // len(unique_choices)], str(unique_choices[pair % len(unique_choices)]))
+            totals[key] = totals.get(key, 0) + count
+    return totals
+
+
+def resolve_bracket(bracket, counts, tiebreak="seed", seed=None):
+    """Decide every remaining match of ``bracket`` from vote ``counts``.
+
+    ``tiebreak`` settles matches with equal (or no) votes: ``"seed"`` picks
+    the entrant added first, ``"random"`` flips a coin (seeded by ``seed``),
+    and a callable ``tiebreak(competitor_a, competitor_b)`` returns the winner.
+    Returns the completed ``bracket.rounds``. Raises ValueError, leaving the
+    bracket untouched, if no open match of the current round got a vote
+    (e.g. a log keyed by songs of another tournament).
+    """
+    tree = bracket.tree
+    rng = random.Random(seed)
+    aliases = {}
+
+    def entrant_keys(entrant):
+        """Every key a log may name an entrant by: its song ID and its name."""
+        keys = aliases.get(entrant)
+        if keys is None:
+            competitor = bracket.competitor(entrant)
+            keys = aliases[entrant] = tuple(dict.fromkeys(key for key in (competitor.song_id, competitor.name) if key))
+        return keys
+
+    def votes(a, b):
+        votes_a = votes_b = 0
+        for key_a in entrant_keys(a):
+            for key_b in entrant_keys(b):
+                matchup = matchup_key(key_a, key_b)
+                votes_a += counts.get((matchup, key_a), 0)
+                votes_b += counts.get((matchup, key_b), 0)
+        return votes_a, votes_b
+
+    open_nodes = [node for node in bracket.rounds[bracket.current_round].nodes if tree.slots[node] == EMPTY]
+    if open_nodes and not any(any(votes(*tree.competitors(node))) for node in open_nodes):
+        raise ValueError(f"No vote in the log is for any of the {len(open_nodes)} open matches of this round")
+
+    while True:
+        for node in bracket.rounds[bracket.current_round].nodes:
+            if tree.slots[node] != EMPTY:
+                continue  # Already decided
+            a, b = tree.competitors(node)
+            votes_a, votes_b = votes(a, b)
+            if votes_a != votes_b:
+                side = 0 if votes_a > votes_b else 1
+            elif tiebreak == "seed":
+                side = 0 if a < b else 1
+            elif tiebreak == "random":
+                side = rng.randrange(2)
+            else:
+                competitor_a = bracket.competitor(a)
+                side = 0 if tiebreak(competitor_a, bracket.competitor(b)) is competitor_a else 1
+            bracket.set_winner(node, side)
+        if bracket.advance_to_next_round() is None:
+            return bracket.rounds
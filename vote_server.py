@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from urllib.parse import parse_qs
+
+VOTE_PAGE = """<!doctype html>
+<html><head><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Music Tournament</title></head>
+<body style="font-family: Helvetica; background: #2e2e2e; color: #fff; text-align: center">
+<h2 id="status">Waiting for the next match...</h2>
+<p><button id="b0" style="font-size: 1.5em; width: 90%; margin: 8px" onclick="vote(0)"></button></p>
+<p><button id="b1" style="font-size: 1.5em; width: 90%; margin: 8px" onclick="vote(1)"></button></p>
+<script>
+let current = null;
+async function refresh() {
+  const match = await (await fetch("/match")).json();
+  if (match.match !== current) {
+    current = match.match;
+    document.getElementById("status").textContent = match.open ? "Vote!" : "Waiting for the next match...";
+    ["b0", "b1"].forEach((id, i) => {
+      const b = document.getElementById(id);
+      b.textContent = match.choices[i] || "";
+      b.disabled = !match.open;
+    });
+  }
+}
+async function vote(choice) {
+  const body = new URLSearchParams({match: current, choice: choice});
+  const reply = await (await fetch("/vote", {method: "POST", body: body})).json();
+  document.getElementById("status").textContent = reply.result === "ok" ? "Thanks for voting!" : reply.result;
+}
+setInterval(refresh, 1000);
+refresh();
+</script></body></html>
+"""
+
+
+class VoteService:
+    """Audience votes for the match currently on screen.
+
+    ``submit`` is called by the server for every vote. It only checks the
+    voter has not voted on this match yet and queues the vote; ``tally``
+    folds the queue into the counts in one batch. The Tk app reads live
+    ``counts`` and calls ``close_match`` to get the final result. All
+    methods are thread-safe.
+    """
+
+    def __init__(self):
+        self.match_key = None
+        self.choices = ()
+        self.is_open = False
+        self._voters = set()  # Voters who already voted on the open match
+        self._pending = deque()  # Choices not tallied yet
+        self._counts = [0, 0]
+        self._lock = threading.Lock()
+
+    def open_match(self, match_key, choices):
+        """Start accepting votes for a new match, dropping the previous one's."""
+        with self._lock:
+            self.match_key = match_key
+            self.choices = tuple(choices)
+            self.is_open = True
+            self._voters = set()
+            self._pending.clear()
+            self._counts = [0] * len(self.choices)
+
+    def submit(self, voter, match_key, choice):
+        """Register one vote; returns "ok", "duplicate", "closed" or "invalid"."""
+        with self._lock:
+            if not self.is_open or match_key != self.match_key:
+                return "closed"
+            if not 0 <= choice < len(self.choices):
+                return "invalid"
+            if voter in self._voters:
+                return "duplicate"
+            self._voters.add(voter)
+            self._pending.append(choice)
+            return "ok"
+
+    def tally(self):
+        """Fold queued votes into the counts."""
+        with self._lock:
+            pending, self._pending = self._pending, deque()
+            counts = self._counts
+            for choice in pending:
+                counts[choice] += 1
+
+    def counts(self):
+        """Votes per choice as of the last tally."""
+        with self._lock:
+            return list(self._counts)
+
+    def close_match(self):
+        """Stop accepting votes for the open match and return its final counts."""
+        with self._lock:
+            self.is_open = False
+        self.tally()
+        return self.counts()
+
+    def describe(self):
+        with self._lock:
+            return {"match": self.match_key, "choices": list(self.choices), "open": self.is_open}
+
+
+class VoteServer:
+    """Minimal HTTP/1.1 front end for a VoteService, on its own asyncio loop.
+
+    ``GET /`` serves a voting page for phones and issues a voter cookie
+    signed with an HMAC, ``GET /match`` describes the open match,
+    ``GET /counts`` returns the live tally and ``POST /vote`` takes
+    ``match`` and ``choice`` as a form or JSON body. The voter is only ever
+    taken from the signed cookie; a body carrying ``voter`` is rejected
+    unless ``trust_voter_field`` is set (for load tests on a trusted
+    network). Connections are kept alive.
+    """
+
+    def __init__(self, service, host="0.0.0.0", port=8765, tally_interval=0.05, secret=None,
+                 trust_voter_field=False):
+        self.service = service
+        self.secret = secret if secret is not None else os.urandom(32)  # Cookies die with the server
+        self.trust_voter_field = trust_voter_field
+        self.host = host
+        self.port = port
+        self.tally_interval = tally_interval
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        """Run the server in a background thread; returns once it is listening."""
+        self._thread = threading.Thread(target=self._run, name="vote-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._server is None:
+            raise OSError(f"Could not listen on {self.host}:{self.port}")
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]  # Resolves port 0
+        finally:
+            self._ready.set()
+        if self._server is None:
+            return
+        tally = self.loop.create_task(self._tally_forever())
+        self.loop.run_forever()
+        tally.cancel()
+        self._server.close()
+        self.loop.run_until_complete(self._server.wait_closed())
+        self.loop.close()
+
+    async def _tally_forever(self):
+        while True:
+            await asyncio.sleep(self.tally_interval)
+            self.service.tally()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, content_type, payload, extra = self._route(method, path, headers, body)
+                head = [
+                    f"HTTP/1.1 {status}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                ] + extra
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method, path, headers, body):
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/":
+            extra = []
+            if self._cookie_voter(headers) is None:
+                extra.append(f"Set-Cookie: voter={self.issue_voter()}; Path=/; HttpOnly; SameSite=Strict")
+            return "200 OK", "text/html; charset=utf-8", VOTE_PAGE.encode("utf-8"), extra
+        if method == "GET" and path == "/match":
+            return self._json(self.service.describe())
+        if method == "GET" and path == "/counts":
+            return self._json({"match": self.service.match_key, "counts": self.service.counts()})
+        if method == "POST" and path == "/vote":
+            fields = self._parse_body(headers, body)
+            if "voter" in fields:
+                if not self.trust_voter_field:
+                    return self._json({"result": "voter comes from the cookie"}, "400 Bad Request")
+                voter = fields["voter"]
+            else:
+                voter = self._cookie_voter(headers)
+            if not voter:
+                return self._json({"result": "no voter id"}, "400 Bad Request")
+            try:
+                choice = int(fields.get("choice", -1))
+            except ValueError:
+                choice = -1
+            return self._json({"result": self.service.submit(voter, fields.get("match"), choice)})
+        return self._json({"result": "not found"}, "404 Not Found")
+
+    @staticmethod
+    def _json(data, status="200 OK"):
+        return status, "application/json", json.dumps(data).encode("utf-8"), []
+
+    @staticmethod
+    def _parse_body(headers, body):
+        if headers.get("content-type", "").startswith("application/json"):
+            return {key: str(value) for key, value in json.loads(body or b"{}").items()}
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+    def issue_voter(self):
+        """A new signed voter cookie value, ``<voter id>.<signature>``."""
+        voter = uuid.uuid4().hex
+        return f"{voter}.{self._sign(voter)}"
+
+    def _sign(self, voter):
+        return hmac.new(self.secret, voter.encode("ascii"), hashlib.sha256).hexdigest()
+
+    def _cookie_voter(self, headers):
+        """The voter ID of a correctly signed voter cookie, else None."""
+        for part in headers.get("cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "voter":
+                voter, _, signature = value.partition(".")
+                if voter.isascii() and signature.isascii() and hmac.compare_digest(signature, self._sign(voter)):
+                    return voter
+        return None
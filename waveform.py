@@ -0,0 +1,128 @@
+import hashlib
+import os
+
+import numpy as np
+
+PEAKS = 32  # Columns per thumbnail, each a (min, max) pair
+PEAKS_RATE = 8000  # Decoding rate for peaks, Hz
+RECORD = np.dtype([("key", "S16"), ("peaks", "i1", (PEAKS, 2))])
+
+
+def compute_peaks(samples, columns=PEAKS):
+    """Min/max of each of ``columns`` equal slices of a track, scaled to int8.
+
+    Returns a (columns, 2) int8 array; the loudest sample maps to 127.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < columns:
+        samples = np.pad(samples, (0, columns - len(samples)))
+    edges = np.linspace(0, len(samples), columns + 1).astype(np.int64)[:-1]
+    peaks = np.stack([np.minimum.reduceat(samples, edges), np.maximum.reduceat(samples, edges)], axis=1)
+    loudest = np.abs(peaks).max()
+    if loudest > 0:
+        peaks *= 127 / loudest
+    return np.round(peaks).astype(np.int8)
+
+
+def peaks_segment(audio):
+    """Peaks of an already decoded pydub AudioSegment, as bytes."""
+    audio = audio.set_channels(1).set_frame_rate(PEAKS_RATE)
+    return compute_peaks(np.array(audio.get_array_of_samples(), dtype=np.float32)).tobytes()
+
+
+def peaks_file(path):
+    from pydub import AudioSegment
+
+    return peaks_segment(AudioSegment.from_file(path))
+
+
+class WaveformStore:
+    """Waveform thumbnails of every song in one memory-mapped file.
+
+    The file is a flat array of fixed-size records (a 16-byte key derived
+    from the song ID, then the peaks), sorted by key, so a lookup is a
+    binary search (``np.searchsorted``) over the mapped key column and
+    opening the store builds no per-key table. Reads go through a read-only
+    ``np.memmap``, so only the pages of the thumbnails actually drawn are
+    ever loaded. New thumbnails are appended with a plain write and found
+    through a small in-memory table until the next start, which merges them
+    into the sorted part.
+    """
+
+    def __init__(self, path="waveforms.bin"):
+        self.path = path
+        self._map = None
+        self._sorted = 0  # Records at the start of the file that are in key order
+        self._tail = {}  # key -> record number, for records appended since opening
+        self._count = 0
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            if size % RECORD.itemsize:  # Torn append from a crash
+                with open(path, "r+b") as f:
+                    f.truncate(size - size % RECORD.itemsize)
+            self._remap()
+            if self._map is not None:
+                keys = self._map["key"]
+                if not (keys[:-1] < keys[1:]).all():
+                    self._sort_file()
+                self._sorted = self._count = len(self._map)
+
+    @staticmethod
+    def key(song_id):
+        return hashlib.sha1(song_id.encode("utf-8")).digest()[:16]
+
+    def _remap(self):
+        records = os.path.getsize(self.path) // RECORD.itemsize if os.path.exists(self.path) else 0
+        self._map = np.memmap(self.path, dtype=RECORD, mode="r", shape=(records,)) if records else None
+
+    def _sort_file(self):
+        """Rewrite the file in key order (after appends from an earlier run)."""
+        records = np.array(self._map)
+        records = records[np.argsort(records["key"], kind="stable")]
+        self._map = None  # Unmap before replacing the file
+        tmp_path = self.path + ".tmp"
+        records.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+        self._remap()
+
+    def _slot(self, key):
+        key = key.rstrip(b"\0")  # How numpy hands back "S16" values
+        if self._sorted:
+            keys = self._map["key"][:self._sorted]
+            slot = int(np.searchsorted(keys, key))
+            if slot < self._sorted and keys[slot] == key:
+                return slot
+        return self._tail.get(key)
+
+    def put(self, song_id, peaks):
+        """Store the thumbnail (bytes from ``peaks_segment``) of a song."""
+        key = self.key(song_id)
+        record = np.zeros(1, dtype=RECORD)
+        record["key"] = key
+        record["peaks"] = np.frombuffer(peaks, dtype=np.int8).reshape(PEAKS, 2)
+        slot = self._slot(key)
+        with open(self.path, "ab" if slot is None else "r+b") as f:
+            if slot is not None:
+                f.seek(slot * RECORD.itemsize)
+            f.write(record.tobytes())
+        if slot is None:
+            self._tail[key.rstrip(b"\0")] = self._count
+            self._count += 1
+
+    def get(self, song_id):
+        """The (PEAKS, 2) int8 peaks of a song, or None if it has no thumbnail."""
+        slot = self._slot(self.key(song_id))
+        if slot is None:
+            return None
+        if self._map is None or slot >= len(self._map):
+            self._remap()  # Appended since the file was last mapped
+        return self._map["peaks"][slot]
+
+    def __contains__(self, song_id):
+        return self._slot(self.key(song_id)) is not None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map = None